@@ -0,0 +1,39 @@
+----------------------------------------------------------
+-- 0001 HOT LOOKUP INDEXES
+----------------------------------------------------------
+/* Indexes for the lookups made on every approval, PDF and email.
+   Extra columns are included so the common queries are answered
+   from the index without touching the table. */
+----------------------------------------------------------
+
+-- Approve/deny: exists check and pending_approval_id/assigned_group lookup
+CREATE INDEX IF NOT EXISTS ix_pending_approvals_line_item
+ON pending_approvals (line_item_uuid, purchase_request_id, status, assigned_group);
+
+-- Approval row count per request
+CREATE INDEX IF NOT EXISTS ix_pending_approvals_purchase_request
+ON pending_approvals (purchase_request_id);
+
+-- Contracting officer lookup and CO/IRQ1 sync triggers
+CREATE INDEX IF NOT EXISTS ix_approvals_purchase_request
+ON approvals (purchase_request_id, CO);
+
+-- SON comments for the PDF and comment endpoints
+CREATE INDEX IF NOT EXISTS ix_son_comments_line_item
+ON son_comments (line_item_uuid);
+
+-- Final approval status checks
+CREATE INDEX IF NOT EXISTS ix_final_approvals_line_item
+ON final_approvals (line_item_uuid, status, deputy_can_approve);
+
+-- Final approver shown on the PDF
+CREATE INDEX IF NOT EXISTS ix_final_approvals_purchase_request
+ON final_approvals (purchase_request_id, final_approved_by, final_approved_at);
+
+-- Line items per request (PDF, justifications, UUID lookup)
+CREATE INDEX IF NOT EXISTS ix_pr_line_items_purchase_request
+ON pr_line_items (purchase_request_id);
+
+-- Active approvers per department (email routing, approver policy)
+CREATE INDEX IF NOT EXISTS ix_workflow_users_department
+ON workflow_users (department, active, username, email);
@@ -0,0 +1,9 @@
+----------------------------------------------------------
+-- 0002 APPROVAL KEYSET INDEX
+----------------------------------------------------------
+/* /getApprovalData pages are ordered and seeked on
+   (created_time, UUID), so each page is an index range scan. */
+----------------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS ix_pr_line_items_created_uuid
+ON pr_line_items (created_time, UUID);
@@ -0,0 +1,126 @@
+----------------------------------------------------------
+-- 0003 APPROVAL VIEW
+----------------------------------------------------------
+/* Denormalized copy of pr_line_items joined to
+   purchase_request_headers, one row per line item with
+   exactly the ApprovalSchema columns. The read endpoints
+   select from it without a join. Kept in sync by the
+   triggers below, check/rebuild offline with
+   python -m api.utils.approval_view_check */
+----------------------------------------------------------
+CREATE TABLE IF NOT EXISTS approval_view (
+	UUID 				VARCHAR NOT NULL PRIMARY KEY,
+	purchase_request_id VARCHAR NOT NULL,
+	IRQ1_ID 			VARCHAR,
+	requester 			VARCHAR NOT NULL,
+	CO 					VARCHAR,
+	datereq 			VARCHAR,
+	orderType 			VARCHAR,
+	itemDescription 	TEXT,
+	justification 		TEXT,
+	trainNotAval 		BOOLEAN,
+	needsNotMeet 		BOOLEAN,
+	budgetObjCode 		VARCHAR,
+	fund 				VARCHAR,
+	priceEach 			FLOAT,
+	totalPrice 			FLOAT,
+	location 			VARCHAR,
+	quantity 			INTEGER,
+	created_time 		DATETIME NOT NULL,
+	isCyberSecRelated 	BOOLEAN,
+	status 				VARCHAR(16)
+);
+
+CREATE INDEX IF NOT EXISTS ix_approval_view_created_uuid
+ON approval_view (created_time, UUID);
+
+CREATE INDEX IF NOT EXISTS ix_approval_view_purchase_request
+ON approval_view (purchase_request_id);
+
+CREATE INDEX IF NOT EXISTS ix_approval_view_status
+ON approval_view (status, created_time);
+
+CREATE INDEX IF NOT EXISTS ix_approval_view_requester
+ON approval_view (requester, created_time);
+
+CREATE INDEX IF NOT EXISTS ix_approval_view_fund
+ON approval_view (fund, created_time);
+
+----------------------------------------------------------
+/* Line item inserted or updated: (re)copy the joined row.
+   Status changes made by the approval triggers land here too */
+----------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS sync_approval_view_on_line_item_insert
+AFTER INSERT ON pr_line_items
+FOR EACH ROW
+BEGIN
+	INSERT OR REPLACE INTO approval_view
+	SELECT li.UUID, hdr.ID, hdr.IRQ1_ID, hdr.requester, hdr.CO, hdr.datereq, hdr.orderType,
+		   li.itemDescription, li.justification, li.trainNotAval, li.needsNotMeet,
+		   li.budgetObjCode, li.fund, li.priceEach, li.totalPrice, li.location, li.quantity,
+		   li.created_time, li.isCyberSecRelated, li.status
+	FROM pr_line_items li
+	JOIN purchase_request_headers hdr ON hdr.ID = li.purchase_request_id
+	WHERE li.UUID = NEW.UUID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_view_on_line_item_update
+AFTER UPDATE ON pr_line_items
+FOR EACH ROW
+BEGIN
+	DELETE FROM approval_view WHERE UUID = OLD.UUID;
+
+	INSERT OR REPLACE INTO approval_view
+	SELECT li.UUID, hdr.ID, hdr.IRQ1_ID, hdr.requester, hdr.CO, hdr.datereq, hdr.orderType,
+		   li.itemDescription, li.justification, li.trainNotAval, li.needsNotMeet,
+		   li.budgetObjCode, li.fund, li.priceEach, li.totalPrice, li.location, li.quantity,
+		   li.created_time, li.isCyberSecRelated, li.status
+	FROM pr_line_items li
+	JOIN purchase_request_headers hdr ON hdr.ID = li.purchase_request_id
+	WHERE li.UUID = NEW.UUID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_view_on_line_item_delete
+AFTER DELETE ON pr_line_items
+FOR EACH ROW
+BEGIN
+	DELETE FROM approval_view WHERE UUID = OLD.UUID;
+END;
+
+----------------------------------------------------------
+/* Header updated: refresh the copied header fields. Values are
+   read back from the table rather than NEW, because
+   sync_co_on_update_prhdr rewrites CO from a nested update */
+----------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS sync_approval_view_on_header_update
+AFTER UPDATE ON purchase_request_headers
+FOR EACH ROW
+BEGIN
+	UPDATE approval_view
+	SET
+		purchase_request_id = NEW.ID,
+		IRQ1_ID 			= (SELECT IRQ1_ID   FROM purchase_request_headers WHERE ID = NEW.ID),
+		requester 			= (SELECT requester FROM purchase_request_headers WHERE ID = NEW.ID),
+		CO 					= (SELECT CO        FROM purchase_request_headers WHERE ID = NEW.ID),
+		datereq 			= (SELECT datereq   FROM purchase_request_headers WHERE ID = NEW.ID),
+		orderType 			= (SELECT orderType FROM purchase_request_headers WHERE ID = NEW.ID)
+	WHERE purchase_request_id IN (OLD.ID, NEW.ID);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_view_on_header_delete
+AFTER DELETE ON purchase_request_headers
+FOR EACH ROW
+BEGIN
+	DELETE FROM approval_view WHERE purchase_request_id = OLD.ID;
+END;
+
+----------------------------------------------------------
+-- Backfill
+----------------------------------------------------------
+INSERT OR REPLACE INTO approval_view
+SELECT li.UUID, hdr.ID, hdr.IRQ1_ID, hdr.requester, hdr.CO, hdr.datereq, hdr.orderType,
+	   li.itemDescription, li.justification, li.trainNotAval, li.needsNotMeet,
+	   li.budgetObjCode, li.fund, li.priceEach, li.totalPrice, li.location, li.quantity,
+	   li.created_time, li.isCyberSecRelated, li.status
+FROM pr_line_items li
+JOIN purchase_request_headers hdr ON hdr.ID = li.purchase_request_id;
@@ -0,0 +1,49 @@
+----------------------------------------------------------
+-- 0004 SEARCH INDEX QUEUE
+----------------------------------------------------------
+/* Purchase requests whose search documents are out of date.
+   Filled by triggers so every write path is covered (ORM,
+   Core updates and the status triggers in pras_sql_script.sql),
+   drained by SearchService after each commit. */
+----------------------------------------------------------
+CREATE TABLE IF NOT EXISTS search_index_queue (
+	seq 				INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+	purchase_request_id VARCHAR NOT NULL
+);
+
+----------------------------------------------------------
+/* approval_view already follows every header and line item
+   change, so queue off it */
+----------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS queue_search_on_approval_view_insert
+AFTER INSERT ON approval_view
+FOR EACH ROW
+BEGIN
+	INSERT INTO search_index_queue (purchase_request_id) VALUES (NEW.purchase_request_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS queue_search_on_approval_view_update
+AFTER UPDATE ON approval_view
+FOR EACH ROW
+BEGIN
+	INSERT INTO search_index_queue (purchase_request_id) VALUES (NEW.purchase_request_id);
+	INSERT INTO search_index_queue (purchase_request_id)
+	SELECT OLD.purchase_request_id WHERE OLD.purchase_request_id <> NEW.purchase_request_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS queue_search_on_approval_view_delete
+AFTER DELETE ON approval_view
+FOR EACH ROW
+BEGIN
+	INSERT INTO search_index_queue (purchase_request_id) VALUES (OLD.purchase_request_id);
+END;
+
+----------------------------------------------------------
+/* addComments is indexed but not part of approval_view */
+----------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS queue_search_on_line_item_comments
+AFTER UPDATE OF addComments ON pr_line_items
+FOR EACH ROW
+BEGIN
+	INSERT INTO search_index_queue (purchase_request_id) VALUES (NEW.purchase_request_id);
+END;
@@ -0,0 +1,76 @@
+----------------------------------------------------------
+-- 0005 APPROVAL FULL TEXT SEARCH (FTS5)
+----------------------------------------------------------
+/* Full text index over approval_view for the "fts5" search
+   backend (settings.search_backend). Rows share approval_view's
+   rowid, so the triggers below maintain it inside the same
+   transaction as the write, with no separate index to sync. */
+----------------------------------------------------------
+CREATE VIRTUAL TABLE IF NOT EXISTS approval_fts USING fts5(
+	ID,
+	IRQ1_ID,
+	CO,
+	requester,
+	itemDescription,
+	justification,
+	addComments,
+	budgetObjCode,
+	fund,
+	location,
+	status,
+	tokenize = 'unicode61',
+	prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_fts_on_view_insert
+AFTER INSERT ON approval_view
+FOR EACH ROW
+BEGIN
+	INSERT INTO approval_fts (rowid, ID, IRQ1_ID, CO, requester, itemDescription, justification,
+							  addComments, budgetObjCode, fund, location, status)
+	VALUES (NEW.rowid, NEW.purchase_request_id, NEW.IRQ1_ID, NEW.CO, NEW.requester, NEW.itemDescription,
+			NEW.justification, (SELECT addComments FROM pr_line_items WHERE UUID = NEW.UUID),
+			NEW.budgetObjCode, NEW.fund, NEW.location, NEW.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_fts_on_view_update
+AFTER UPDATE ON approval_view
+FOR EACH ROW
+BEGIN
+	DELETE FROM approval_fts WHERE rowid = OLD.rowid;
+	INSERT INTO approval_fts (rowid, ID, IRQ1_ID, CO, requester, itemDescription, justification,
+							  addComments, budgetObjCode, fund, location, status)
+	VALUES (NEW.rowid, NEW.purchase_request_id, NEW.IRQ1_ID, NEW.CO, NEW.requester, NEW.itemDescription,
+			NEW.justification, (SELECT addComments FROM pr_line_items WHERE UUID = NEW.UUID),
+			NEW.budgetObjCode, NEW.fund, NEW.location, NEW.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sync_approval_fts_on_view_delete
+AFTER DELETE ON approval_view
+FOR EACH ROW
+BEGIN
+	DELETE FROM approval_fts WHERE rowid = OLD.rowid;
+END;
+
+----------------------------------------------------------
+/* addComments is indexed but not part of approval_view */
+----------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS sync_approval_fts_on_line_item_comments
+AFTER UPDATE OF addComments ON pr_line_items
+FOR EACH ROW
+BEGIN
+	UPDATE approval_fts
+	SET addComments = NEW.addComments
+	WHERE rowid = (SELECT rowid FROM approval_view WHERE UUID = NEW.UUID);
+END;
+
+----------------------------------------------------------
+-- Backfill
+----------------------------------------------------------
+DELETE FROM approval_fts;
+INSERT INTO approval_fts (rowid, ID, IRQ1_ID, CO, requester, itemDescription, justification,
+						  addComments, budgetObjCode, fund, location, status)
+SELECT av.rowid, av.purchase_request_id, av.IRQ1_ID, av.CO, av.requester, av.itemDescription,
+	   av.justification, li.addComments, av.budgetObjCode, av.fund, av.location, av.status
+FROM approval_view av
+LEFT JOIN pr_line_items li ON li.UUID = av.UUID;
@@ -0,0 +1,29 @@
+----------------------------------------------------------
+-- 0006 DRAFT KEEP-ALIVE AND ONE DRAFT PER REQUESTER
+----------------------------------------------------------
+/* /createNewID used to keep a draft alive by rewriting its
+   created_time; it now refreshes touched_time, and the draft
+   reclaimer ages drafts by it. The partial unique index makes
+   a second IN_PROGRESS header for the same requester
+   impossible, so concurrent first calls share one draft. */
+----------------------------------------------------------
+
+-- touched_time is added by create_schema (add_missing_columns); start it from created_time
+UPDATE purchase_request_headers
+SET touched_time = created_time
+WHERE touched_time IS NULL;
+
+-- Older duplicates were never returned to their requester (the newest draft wins)
+UPDATE purchase_request_headers
+SET submission_status = 'CANCELLED'
+WHERE submission_status = 'IN_PROGRESS'
+  AND purchase_request_seq_id NOT IN (
+	SELECT MAX(purchase_request_seq_id)
+	FROM purchase_request_headers
+	WHERE submission_status = 'IN_PROGRESS'
+	GROUP BY requester
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_purchase_request_headers_draft
+ON purchase_request_headers (requester)
+WHERE submission_status = 'IN_PROGRESS';
@@ -9,6 +9,8 @@ from api.services.auth_service              import AuthService
 from api.services.pdf_service               import PDFService
 from api.services.uuid_service              import UUIDService
 from api.services.search_service            import SearchService
+from api.services.fts_search_service        import Fts5SearchService
+from api.services.typeahead_service         import TypeaheadService
 from api.dependencies.pras_schemas          import *
 
 # —————————————— Email Renderer ————————————————————
@@ -53,12 +55,20 @@ uuid_service = UUIDService()
 search_service = None
 
 def get_search_service():
-    """Get or create the search service instance"""
+    """Get or create the search service instance for settings.search_backend"""
     global search_service
     if search_service is None:
-        search_service = SearchService()
+        if settings.search_backend == "fts5":
+            search_service = Fts5SearchService()
+        else:
+            search_service = SearchService()
     return search_service
 
+# -----------------------------------------------------
+# Typeahead Service
+# -----------------------------------------------------
+typeahead_service = TypeaheadService()
+
 # -----------------------------------------------------
 # Auth Service
 # -----------------------------------------------------
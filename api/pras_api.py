@@ -21,13 +21,13 @@ EXPLANATION OF COMMENT COLORS:
 TO LAUNCH SERVER:
 uvicorn pras_api:app --host 127.0.0.1 --port 5004
 """
-from datetime import datetime
+from datetime import date, datetime
 import json
 import time
 import signal
 import socketio
 from pathlib import Path
-from typing import Awaitable, Callable, ParamSpec, TypeVar
+from typing import Awaitable, Callable, Literal, ParamSpec, TypeVar
 from api.schemas.approval_schemas import ApprovalRequest, ApprovalSchema, DenyPayload, UpdatePricesPayload, UpdateBocLocFundPayload, BocLocFundPayload
 from api.schemas.boc_fund_mapping.boc_to_fund_mapping import BocMapping092000, BocMapping51140X, BocMapping51140E
 from api.schemas.purchase_schemas import AssignCOPayload
@@ -41,11 +41,12 @@ from fastapi import (
     FastAPI, APIRouter, Depends, Form, 
     File, UploadFile, HTTPException, Request, 
     Query, status, WebSocket, WebSocketDisconnect)
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from api.utils.logging_utils import logger_init_ok
+import api.utils.json_utils as json_utils
 
 # SQLAlchemy
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -62,7 +63,9 @@ from api.dependencies.pras_dependencies import smtp_service
 from api.dependencies.pras_dependencies import ldap_service
 from api.dependencies.pras_dependencies import auth_service
 from api.dependencies.pras_dependencies import pdf_service
+from api.services.son_export_service import stream_statements_of_need_zip
 from api.dependencies.pras_dependencies import search_service
+from api.dependencies.pras_dependencies import typeahead_service
 from api.dependencies.pras_dependencies import settings
 from api.schemas.email_schemas import LineItemsPayload, EmailPayloadRequest, EmailPayloadComment
 from api.services.db_service import utc_now_truncated
@@ -113,6 +116,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 api_router = APIRouter(prefix="/api", tags=["API Endpoints"])
@@ -136,6 +140,7 @@ async def initialize_database():
     from api.services.db_service import init_db
     try:
         await init_db()
+        await dbas.check_sqlite_pragmas()
         logger_init_ok("Database initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
@@ -146,13 +151,40 @@ async def initialize_search_service():
     """Initialize the search service after database is ready"""
     from api.dependencies.pras_dependencies import get_search_service
     try:
-        # This will create the search service and build the index
-        get_search_service()
+        # This will create the search service and build the index (sync DB + disk IO, so off the loop)
+        await asyncio.to_thread(get_search_service)
         logger_init_ok("Search service initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing search service: {e}")
         # Don't raise here as search service is not critical for startup
 
+# Merge search index segments off-peak (after the search service exists)
+@app.on_event("startup")
+async def start_search_index_maintenance():
+    import api.dependencies.pras_dependencies as pras_dependencies
+    if pras_dependencies.search_service is None:
+        logger.warning("Search service not initialized, index maintenance not started")
+        return
+    try:
+        asyncio.create_task(pras_dependencies.search_service.start_index_maintenance(
+            interval_sec=settings.search_maintenance_interval_sec,
+        ))
+    except Exception as e:
+        logger.error(f"Error starting search index maintenance: {e}")
+    
+# Spawn and warm the PDF render worker processes
+@app.on_event("startup")
+async def start_pdf_render_engine():
+    try:
+        await pdf_service.render_engine.start()
+    except Exception as e:
+        # Workers are started on the first render instead
+        logger.error(f"Error starting PDF render engine: {e}")
+
+@app.on_event("shutdown")
+async def stop_pdf_render_engine():
+    pdf_service.render_engine.shutdown()
+
 @app.on_event("startup")
 async def _capture_loop():
     from api.services.socketio_server.sio_instance import set_server_loop
@@ -175,6 +207,35 @@ async def start_keepalive_ldap():
         logger_init_ok("LDAP keepalive failed to start")
         raise e
     
+# Reclaim draft request IDs that were reserved but never submitted
+@app.on_event("startup")
+async def start_draft_reclaimer():
+    logger_init_ok("Draft reclaimer starting")
+    try:
+        asyncio.create_task(dbas.start_draft_reclaimer(
+            interval_sec=settings.draft_reclaim_interval_sec,
+            ttl_hours=settings.draft_ttl_hours,
+        ))
+    except Exception as e:
+        logger.error(f"Error starting draft reclaimer: {e}")
+        logger_init_ok("Draft reclaimer failed to start")
+        raise e
+    
+# Build the typeahead prefix indexes and keep them current
+@app.on_event("startup")
+async def start_typeahead_refresh():
+    logger_init_ok("Typeahead refresh starting")
+    try:
+        asyncio.create_task(typeahead_service.start_refresh(
+            ldap_service,
+            interval_sec=settings.typeahead_refresh_interval_sec,
+            directory_interval_sec=settings.typeahead_directory_refresh_sec,
+        ))
+    except Exception as e:
+        logger.error(f"Error starting typeahead refresh: {e}")
+        logger_init_ok("Typeahead refresh failed to start")
+        raise e
+    
 @app.on_event("startup")
 async def _install_loop_exception_handler():
     loop = asyncio.get_running_loop()
@@ -252,11 +313,124 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 @api_router.get("/getApprovalData", response_model=List[ApprovalSchema])
 async def get_approval_data(
     ID: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.approval_page_size_max),
+    status: Optional[List[ItemStatus]] = Query(None),
+    fund: Optional[str] = Query(None),
+    requester: Optional[str] = Query(None),
+    assigned_group: Optional[AssignedGroup] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
     db: AsyncSession = Depends(get_async_session),
     current_user: LDAPUser = Depends(auth_service.get_current_user)
 ):
-    return await dbas.fetch_flat_approvals(db, ID=ID)
+    """
+    Line items newest first. Without limit or cursor every matching row comes back at once
+    (what the approval grid expects); otherwise one page, approval_page_size rows unless
+    limit says otherwise, and the X-Next-Cursor response header carries the token for the next page.
+    """
+    if limit is None and cursor is not None:
+        limit = settings.approval_page_size
+    try:
+        rows, next_cursor = await dbas.fetch_approval_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            ID=ID,
+            status=status,
+            fund=fund,
+            requester=requester,
+            assigned_group=assigned_group,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Rows come from our own schema, so skip response_model validation and encode directly
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=json_utils.dumps(rows), media_type="application/json", headers=headers)
+    
+##########################################################################
+## STREAM APPROVAL DATA
+##########################################################################
+@api_router.get("/getApprovalData/stream")
+async def stream_approval_data(
+    ID: Optional[str] = Query(None),
+    format: Literal["ndjson", "json"] = Query("ndjson"),
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """
+    Same rows as /getApprovalData without paging, encoded as they come off the DB cursor.
+    ndjson writes one object per line; json writes a single array incrementally.
+    """
+    async def encode():
+        first = True
+        if format == "json":
+            yield b"["
+        async for chunk in dbas.stream_flat_approvals(ID=ID, chunk_size=settings.approval_stream_chunk_size):
+            if format == "ndjson":
+                yield b"".join(json_utils.dumps(row) + b"\n" for row in chunk)
+            else:
+                body = b",".join(json_utils.dumps(row) for row in chunk)
+                if body:
+                    yield body if first else b"," + body
+                    first = False
+        if format == "json":
+            yield b"]"
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(encode(), media_type=media_type)
     
+##########################################################################
+## EXPORT STATEMENTS OF NEED (ZIP)
+##########################################################################
+@api_router.get("/exportStatementsOfNeed")
+async def export_statements_of_need(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    fund: Optional[str] = Query(None),
+    status: Optional[List[ItemStatus]] = Query(None),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """
+    Every statement of need with a line item matching the filters, as a ZIP streamed while the
+    PDFs render. date_from / date_to are inclusive days on the line item created_time.
+    Progress goes to the caller's socket as PROGRESS_UPDATE events.
+    """
+    ids = await dbas.fetch_purchase_request_ids(db, status=status, fund=fund, date_from=date_from, date_to=date_to)
+    if not ids:
+        raise HTTPException(status_code=404, detail="No purchase requests match the filters")
+    if len(ids) > settings.son_export_max_requests:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(ids)} purchase requests match; narrow the filters to at most {settings.son_export_max_requests}",
+        )
+    logger.info(f"{current_user.username} exporting {len(ids)} statement(s) of need")
+
+    filename = f"statements_of_need_{date_from or 'start'}_{date_to or date.today()}.zip"
+    return StreamingResponse(
+        stream_statements_of_need_zip(
+            pdf_service,
+            ids,
+            concurrency=settings.son_export_concurrency,
+            sid=sio_events.get_user_sid(current_user),
+        ),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+##########################################################################
+## STATEMENT OF NEED RENDER CACHE STATS
+##########################################################################
+@api_router.get("/statementOfNeedCacheStats")
+async def get_statement_of_need_cache_stats(
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """Hit rate, size and render time saved by the statement of need PDF cache."""
+    return pdf_service.render_cache.stats()
+
 ##########################################################################
 ## GET STATEMENT OF NEED FORM
 ##########################################################################
@@ -292,31 +466,28 @@ async def download_statement_of_need_form(
         raise HTTPException(status_code=400, detail="ID is required")
 
     try:
-        output_path = await pdf_service.create_pdf(
+        # Rendered (or taken from the render cache) in memory; nothing is written under output/
+        pdf = await pdf_service.create_pdf_bytes(
             ID=ID,
             db=db,
             payload=payload,
             current_user=current_user,
         )
-        
-        # Convert to Path object if it's a string
-        if isinstance(output_path, str):
-            output_path = Path(output_path)
-        
-        if not output_path.exists():
-            raise HTTPException(status_code=404, detail="Statement of need form not found")
 
-        # File does exists 
+        # Document is ready
         if sid:
             step_data = download_tracker.mark_step_done(DownloadStepName.VERIFY_FILE_EXISTS)
             if step_data:
                 await sio_events.progress_update(sid, step_data)
         
-        return FileResponse(
-            path=str(output_path),
+        # Response sets Content-Length from the body
+        return Response(
+            content=pdf,
             media_type="application/pdf",
-            filename=output_path.name
+            headers={"Content-Disposition": f'attachment; filename="statement_of_need-{ID}.pdf"'},
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -331,12 +502,53 @@ async def get_search_data(
 ):
     # Use the standard execute_search method
     from api.dependencies.pras_dependencies import get_search_service
-    results = get_search_service().execute_search(query, db=None)
+    results = await get_search_service().search(query)
     logger.debug(f"RESULTS: {results}")
     
     logger.info(f"Search results for query '{query}': {len(results) if results else 0} items found")
     return JSONResponse(content=jsonable_encoder(results))
 
+##########################################################################
+## GET FACETED SEARCH DATA
+##########################################################################
+@api_router.get("/getSearchData/faceted")
+async def get_faceted_search_data(
+    query: str = "",
+    page: int = Query(1, ge=1),
+    pagelen: int = Query(25, ge=1, le=200),
+    sort: Optional[Literal["totalPrice", "createdTime"]] = Query(None, description="Omit for relevance"),
+    reverse: bool = Query(False),
+    status: Optional[str] = Query(None),
+    fund: Optional[str] = Query(None),
+    budgetObjCode: Optional[str] = Query(None),
+    location: Optional[str] = Query(None),
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """
+    Paged search with total hit count and status/fund/budgetObjCode/location facet counts.
+    The facet params narrow the results to an exact value.
+    """
+    from api.dependencies.pras_dependencies import get_search_service
+    return await get_search_service().faceted_search(
+        query,
+        page=page,
+        pagelen=pagelen,
+        sort=sort,
+        reverse=reverse,
+        filters={"status": status, "fund": fund, "budgetObjCode": budgetObjCode, "location": location},
+    )
+
+##########################################################################
+## SEARCH CACHE STATS
+##########################################################################
+@api_router.get("/getSearchData/cacheStats")
+async def get_search_cache_stats(
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """Hit/miss counters and size of the search result cache."""
+    from api.dependencies.pras_dependencies import get_search_service
+    return get_search_service().cache_stats()
+
 ##########################################################################
 ## REBUILD SEARCH INDEX
 ##########################################################################
@@ -347,7 +559,7 @@ async def rebuild_search_index(
     """Rebuild the search index from scratch."""
     try:
         from api.dependencies.pras_dependencies import get_search_service
-        get_search_service().rebuild_index()
+        await asyncio.to_thread(get_search_service().rebuild_index)
         return {"message": "Search index rebuilt successfully"}
     except Exception as e:
         logger.error(f"Error rebuilding search index: {e}")
@@ -385,20 +597,21 @@ async def _save_files(ID: str, file: UploadFile) -> str:
 ##########################################################################
 # Generate PDF
 async def generate_pdf(
-    payload: PurchaseRequestPayload, 
     ID: str, 
-    db: AsyncSession,
-    uploaded_files: Optional[List[str]] = None) -> str:
+    rows: List[dict],
+    order_type: Optional[str] = None,
+    contracting_officer: Optional[str] = None) -> str:
     try:
         # Make sure dir exists
         pdf_output_dir = settings.PDF_OUTPUT_FOLDER
         os.makedirs(pdf_output_dir, exist_ok=True)
         
-        # Use the asynchronous create_pdf method
-        pdf_path = await pdf_service.create_pdf(
+        # Render from the rows the submission already has in memory
+        pdf_path = await pdf_service.create_pdf_from_rows(
             ID=ID,
-            db=db,
-            payload=jsonable_encoder(payload)
+            rows=rows,
+            order_type=order_type,
+            contracting_officer=contracting_officer,
         )
         
         # Convert to absolute path and verify it exists
@@ -509,20 +722,11 @@ async def send_purchase_request(
     # Build header & line items inside a single transaction
     pdf_path: str | None = None
     async with db.begin():
-        # Generate the purchase request ID
-        # Subquery to find the maximum purchase_request_seq_id
-        subq = (
-            select(func.max(PurchaseRequestHeader.purchase_request_seq_id))
-            .scalar_subquery()
-        )
-        
-        # Outer query to get the row with that max seq ID
-        stmt = (
-            select(PurchaseRequestHeader.ID)
-            .where(PurchaseRequestHeader.purchase_request_seq_id == subq)
-        )
-        result = await db.execute(stmt)
-        purchase_req_id = result.scalar_one_or_none()
+        # Use the requester's own draft ID, reserve one if the draft was reclaimed
+        requester = format_username(current_user.username)
+        purchase_req_id = await dbas.get_draft_for_requester(db, requester)
+        if purchase_req_id is None:
+            purchase_req_id = await dbas.set_purchase_req_id(db, requester=requester)
         
         #! PROGRESS TRACKING ----------------------------------------------------------
         if sid:
@@ -582,72 +786,6 @@ async def send_purchase_request(
         pr_line_item_uuids: List[str] = []
         uploaded_files: List[str] = []
         
-        # Handle case where no files are provided
-        files_list = []
-        
-        #?#################################################################################
-        #? INSERTING THE LINE ITEMS TO DB
-        #?#################################################################################
-        for idx, item in enumerate(payload.items):
-            file = files_list[idx] if idx < len(files_list) else None
-            
-            # Create line item
-            orm_pr_line_item = PurchaseRequestLineItem(
-                purchase_request_id=purchase_req_id,
-                itemDescription=item.item_description,
-                justification=item.justification,
-                addComments="; ".join(item.additional_comments) if item.additional_comments else None,
-                trainNotAval=item.train_not_aval,
-                needsNotMeet=item.needs_not_meet,
-                budgetObjCode=item.budget_obj_code,
-                fund=item.fund,
-                quantity=item.quantity,
-                priceEach=item.price_each,
-                originalPriceEach=item.price_each,
-                totalPrice=item.total_price,
-                location=item.location,
-                isCyberSecRelated=item.is_cyber_sec_related,
-                status=item.status,
-                created_time=utc_now_truncated(),
-            )
-            db.add(orm_pr_line_item)
-            await db.flush() # UUID is now available
-            
-            #! PROGRESS TRACKING ----------------------------------------------------------
-            if sid:
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.LINE_ITEMS_INSERTED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
-            #!-----------------------------------------------------------------------------
-            
-            # #?#################################################################################
-            # #? UPLOADING FILES IF USER ADDED ANY
-            # #?#################################################################################
-            # # Save uploaded file if exists
-            # if file and file.filename:
-            #     upload_dir = Path("uploads")
-            #     upload_dir.mkdir(exist_ok=True)
-                
-            #     filename = f"{orm_pr_line_item.UUID}_{file.filename}"
-            #     logger.debug(f"FILENAME: {filename}")
-            #     full_path = upload_dir / filename
-            #     logger.debug(f"FULL PATH: {full_path}")
-                
-            #     with open(full_path, "wb") as f:
-            #         f.write(await file.read())
-            #     logger.debug(f"FILE WRITTEN")
-                    
-            #     # Save file path to table in ORM model
-            #     orm_pr_line_item.uploaded_file_path = str(full_path.resolve())
-            #     uploaded_files.append(str(full_path.resolve()))
-            #     logger.debug(f"UPLOADED FILES: {uploaded_files}")
-            # UUID tracking
-            pr_line_item_uuids.append(orm_pr_line_item.UUID)
-            if sid:
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.FILES_UPLOADED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
-            
         #?#################################################################################
         #? SETTING THE CONTRACTING OFFICER
         #?#################################################################################
@@ -669,95 +807,180 @@ async def send_purchase_request(
         logger.info(f"Contracting officer username: {contracting_officer_username}")
         
         #?#################################################################################
-        #? INSERTING THE REQUEST INTO THE APPROVAL TABLE
+        #? BUILD LINE ITEM, APPROVAL AND PENDING APPROVAL ROWS
         #?#################################################################################
-        approvals: List[Approval] = []
-        for item, line_uuid in zip(payload.items, pr_line_item_uuids):
-            appr = Approval(
-                UUID=str(uuid.uuid4()),
-                purchase_request_id=purchase_req_id,
-                requester=format_username(payload.requester),
-                CO=contracting_officer_username,
-                datereq=item.datereq,
-                orderType=item.order_type,
-                itemDescription=item.item_description,
-                justification=item.justification,
-                trainNotAval=item.train_not_aval,
-                needsNotMeet=item.needs_not_meet,
-                budgetObjCode=item.budget_obj_code,
-                fund=item.fund,
-                priceEach=item.price_each,
-                totalPrice=item.total_price,
-                location=item.location,
-                quantity=item.quantity,
-                status=item.status,
-                created_time=utc_now_truncated(),
-            )
-            db.add(appr)
-            await db.flush()
-            approvals.append(appr)
-            if sid:
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.APPROVAL_RECORDS_CREATED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
+        """
+        UUIDs are generated here instead of by flushing ORM objects one at a time,
+        so all three row sets can be inserted with one executemany each.
+        
+        Separating the requests based on the fund
+        The 511x goes to IT (MATT STRONG)
+        The 092x goes to "FINANCE" (LELA ROBICHAUX AND EDMUND BROWN)
+        The MANAGEMENT requests could possibly never be sent to TED (EDWARD TAKARA), 
+            if EDMUND (DEPUTY CLERK) can approve it (< $250)
+        """
+        created_time = utc_now_truncated()
+        line_item_rows: List[dict] = []
+        approval_rows: List[dict] = []
+        pending_approval_rows: List[dict] = []
+        pdf_rows: List[dict] = []
+        
+        for item in payload.items:
+            line_uuid = str(uuid.uuid4())
+            approval_uuid = str(uuid.uuid4())
+            pr_line_item_uuids.append(line_uuid)
+            
+            line_item_rows.append({
+                "UUID": line_uuid,
+                "purchase_request_id": purchase_req_id,
+                "itemDescription": item.item_description,
+                "justification": item.justification,
+                "addComments": "; ".join(item.additional_comments) if item.additional_comments else None,
+                "trainNotAval": item.train_not_aval,
+                "needsNotMeet": item.needs_not_meet,
+                "budgetObjCode": item.budget_obj_code,
+                "fund": item.fund,
+                "quantity": item.quantity,
+                "priceEach": item.price_each,
+                "originalPriceEach": item.price_each,
+                "totalPrice": item.total_price,
+                "location": item.location,
+                "isCyberSecRelated": item.is_cyber_sec_related,
+                "status": item.status,
+                "created_time": created_time,
+            })
+            
+            approval_rows.append({
+                "UUID": approval_uuid,
+                "purchase_request_id": purchase_req_id,
+                "requester": format_username(payload.requester),
+                "CO": contracting_officer_username,
+                "datereq": item.datereq,
+                "orderType": item.order_type,
+                "itemDescription": item.item_description,
+                "justification": item.justification,
+                "trainNotAval": item.train_not_aval,
+                "needsNotMeet": item.needs_not_meet,
+                "budgetObjCode": item.budget_obj_code,
+                "fund": item.fund,
+                "priceEach": item.price_each,
+                "totalPrice": item.total_price,
+                "location": item.location,
+                "quantity": item.quantity,
+                "status": item.status,
+                "created_time": created_time,
+            })
+            
+            # Same shape as fetch_flat_approvals rows, used to render the PDF after commit
+            pdf_rows.append({
+                "UUID": line_uuid,
+                "purchase_request_id": purchase_req_id,
+                "IRQ1_ID": payload.irq1_id,
+                "requester": requester,
+                "CO": contracting_officer_username,
+                "datereq": payload.items[0].datereq,
+                "orderType": payload.items[0].order_type,
+                "itemDescription": item.item_description,
+                "justification": item.justification,
+                "trainNotAval": item.train_not_aval,
+                "needsNotMeet": item.needs_not_meet,
+                "budgetObjCode": item.budget_obj_code,
+                "fund": item.fund,
+                "priceEach": item.price_each,
+                "totalPrice": item.total_price,
+                "location": item.location,
+                "quantity": item.quantity,
+                "created_time": created_time,
+                "isCyberSecRelated": item.is_cyber_sec_related,
+                "status": item.status,
+            })
             
-            """
-            Separating the requests based on the fund
-            The 511x goes to IT (MATT STRONG)
-            The 092x goes to "FINANCE" (LELA ROBICHAUX AND EDMUND BROWN)
-            The MANAGEMENT requests could possibly never be sent to TED (EDWARD TAKARA), 
-				if EDMUND (DEPUTY CLERK) can approve it (< $250)
-            """
             if item.fund.startswith("511"):
                 assigned_group = AssignedGroup.IT.value
             elif item.fund.startswith("092"):
                 assigned_group = AssignedGroup.MANAGEMENT.value
-
-            task = PendingApproval(
-                purchase_request_id=purchase_req_id,
-                line_item_uuid=line_uuid,
-                approvals_uuid=appr.UUID,
-                assigned_group=assigned_group,
-                status=ItemStatus.NEW_REQUEST,
-            )
-            db.add(task)
-            await db.flush()
-            
-            #! PROGRESS TRACKING ----------------------------------------------------------
-            submit_request_tracker.mark_step_done(SubmitRequestStepName.PENDING_APPROVAL_INSERTED)
-            #!-----------------------------------------------------------------------------
             
-            stmt = select(PurchaseRequestHeader).where(PurchaseRequestHeader.ID == purchase_req_id)
-            result = await db.execute(stmt)
-            orm_pr_header = result.scalar_one_or_none()
-            
-            # Generate PDF once for the entire purchase request
-            logger.info("Generating PDF document")
-            if sid:
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_GENERATION_STARTED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
-                
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_TEMPLATE_LOADED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
-                
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_DATA_MERGED)
-                if step_data:
-                    await sio_events.progress_update(sid, step_data)
-            pdf_path: str = await generate_pdf(payload, orm_pr_header.ID, db, uploaded_files)
-            
-            
-            #! PROGRESS TRACKING ----------------------------------------------------------
-            if sid:
-                step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_RENDERED)
+            pending_approval_rows.append({
+                "purchase_request_id": purchase_req_id,
+                "line_item_uuid": line_uuid,
+                "approvals_uuid": approval_uuid,
+                "assigned_group": assigned_group,
+                "status": ItemStatus.NEW_REQUEST,
+                "created_at": created_time,
+                "processed_at": created_time,
+            })
+        
+        #?#################################################################################
+        #? INSERTING THE LINE ITEMS, APPROVALS AND PENDING APPROVALS TO DB
+        #?#################################################################################
+        await db.execute(insert(PurchaseRequestLineItem), line_item_rows)
+        
+        #! PROGRESS TRACKING ----------------------------------------------------------
+        if sid:
+            for step_name in (SubmitRequestStepName.LINE_ITEMS_INSERTED, SubmitRequestStepName.FILES_UPLOADED):
+                step_data = submit_request_tracker.mark_step_done(step_name)
                 if step_data:
                     await sio_events.progress_update(sid, step_data)
-            #!-----------------------------------------------------------------------------
-            
-            orm_pr_header.pdf_output_path = pdf_path
+        #!-----------------------------------------------------------------------------
+        
+        await db.execute(insert(Approval), approval_rows)
+        if sid:
+            step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.APPROVAL_RECORDS_CREATED)
+            if step_data:
+                await sio_events.progress_update(sid, step_data)
+        
+        await db.execute(insert(PendingApproval), pending_approval_rows)
+        
+        #! PROGRESS TRACKING ----------------------------------------------------------
+        submit_request_tracker.mark_step_done(SubmitRequestStepName.PENDING_APPROVAL_INSERTED)
+        #!-----------------------------------------------------------------------------
+        
     #* <--- transaction is committed here
     
+    #?#########################################################################
+    #?# RENDER THE PDF -- once, from the rows already in memory
+    #?#########################################################################
+    logger.info("Generating PDF document")
+    if sid:
+        step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_GENERATION_STARTED)
+        if step_data:
+            await sio_events.progress_update(sid, step_data)
+        
+        step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_TEMPLATE_LOADED)
+        if step_data:
+            await sio_events.progress_update(sid, step_data)
+        
+        step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_DATA_MERGED)
+        if step_data:
+            await sio_events.progress_update(sid, step_data)
+    # The request is already committed: a failed render must not fail the submission (the
+    # client would resubmit it). Notify without the PDF; approval emails render it on demand.
+    try:
+        pdf_path = await generate_pdf(
+            purchase_req_id,
+            pdf_rows,
+            order_type=payload.items[0].order_type,
+            contracting_officer=contracting_officer_username,
+        )
+        
+        #! PROGRESS TRACKING ----------------------------------------------------------
+        if sid:
+            step_data = submit_request_tracker.mark_step_done(SubmitRequestStepName.PDF_RENDERED)
+            if step_data:
+                await sio_events.progress_update(sid, step_data)
+        #!-----------------------------------------------------------------------------
+        
+        await db.execute(
+            update(PurchaseRequestHeader)
+            .where(PurchaseRequestHeader.ID == purchase_req_id)
+            .values(pdf_output_path=pdf_path)
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        pdf_path = None
+        logger.error(f"Statement of need for {purchase_req_id} was not rendered, notifying without it: {e!r}")
+    
     #?#########################################################################
     #?# EMAIL PAYLOADS
     #?#########################################################################
@@ -1158,18 +1381,20 @@ async def assign_contracting_officer(
     # Add a create NEW ID call here, there could be instance where user
     # wants to send another request right after one
     try:
-        row = await dbas.get_last_row_purchase_request_id(db=db)
-        logger.info(f"ROW: {row}")
-        if row.submission_status == "IN_PROGRESS":
+        requester = format_username(current_user.username)
+        draft_id = await dbas.get_draft_for_requester(db, requester)
+        logger.info(f"DRAFT ID: {draft_id}")
+        if draft_id:
             # Update the contracting officer
             stmt = (update(PurchaseRequestHeader)
-                    .where(PurchaseRequestHeader.ID == row.ID)
+                    .where(PurchaseRequestHeader.ID == draft_id)
                     .values(contracting_officer_id=payload.contracting_officer_id))
             await db.execute(stmt)
             await db.commit()
             
-        elif row.submission_status == "SUBMITTED":
-            purchase_req_id = await dbas.set_purchase_req_id(db=db)
+        else:
+            purchase_req_id = await dbas.set_purchase_req_id(db=db, requester=requester)
+            await db.commit()
             logger.info(f"New purchase request id: {purchase_req_id}")
             return {"ID": purchase_req_id}
         logger.info(f"ASSIGN CO PAYLOAD: {payload}")
@@ -1473,35 +1698,15 @@ async def create_new_id(
         from purchase_request_seq_id, only allow the creation if the last row is submitted
     
     """
+    requester = format_username(current_user.username)
     try:
-        # Start explicit transaction
+        # Each requester owns their own IN_PROGRESS draft, so there is no global lock here.
+        # Only inserting a draft or refreshing a stale keep-alive writes (see reserve_draft_id).
         async with db.begin():
-            # Grab explicit lock
-            await db.execute(text("BEGIN EXCLUSIVE"))
-            
-            # Check last row status inside transaction
-            last_row_status = await dbas.get_last_row_any_status(db=db)
-            logger.info(f"Last row status: {last_row_status}")
-            
-            # IN_PROGRESS -- return the last row ID
-            if last_row_status == "IN_PROGRESS":
-                stmt = (
-                    select(
-                        PurchaseRequestHeader.ID
-                    )
-                    .where(PurchaseRequestHeader.submission_status == "IN_PROGRESS")
-                )
-                result = await db.execute(stmt)
-                last_row_id = result.scalar_one_or_none()
-                return {"ID": last_row_id}
-            
-            # SUBMITTED or None -- create a new ID, we're at a new request
-            if last_row_status == "SUBMITTED" or last_row_status is None:
-                purchase_req_id = await dbas.set_purchase_req_id(db=db)
-                logger.info(f"New purchase request id: {purchase_req_id}")
-                return {"ID": purchase_req_id}
+            purchase_req_id = await dbas.reserve_draft_id(db=db, requester=requester)
         
-        raise HTTPException(status_code=400, detail="Could not create new ID due to race condition")
+        logger.info(f"Draft purchase request id for {requester}: {purchase_req_id}")
+        return {"ID": purchase_req_id}
             
     except Exception as e:
         logger.error(f"Error creating new id: {e}")
@@ -1539,8 +1744,29 @@ async def get_usernames(
 ):
     """
     Return a list of username strings that start with the given prefix `q`.
+    Answered from the directory snapshot; falls back to a live LDAP search until it has loaded.
+    """
+    if not typeahead_service.directory_loaded:
+        return await ldap_service.fetch_usernames(q, current_user.username)
+    usernames = typeahead_service.complete("username", q.replace(" ", ""), limit=10)
+    ldap_service.notify_username_lookup(bool(usernames), current_user.username)
+    return usernames
+
+##########################################################################
+## TYPEAHEAD
+##########################################################################
+@api_router.get("/typeahead/{field}", response_model=List[str])
+async def typeahead(
+    field: Literal["requester", "itemDescription", "location", "username"],
+    q: str = Query(..., min_length=1, description="Prefix to complete"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: LDAPUser = Depends(auth_service.get_current_user)
+):
+    """
+    Return up to `limit` known values of `field` starting with `q` (case-insensitive),
+    from the in-memory prefix indexes.
     """
-    return await ldap_service.fetch_usernames(q, current_user.username)
+    return typeahead_service.complete(field, q, limit)
 
 ##########################################################################
 ## ADD COMMENTS BULK
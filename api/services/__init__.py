@@ -5,6 +5,8 @@ PRAS API Package
 from api.services.auth_service import AuthService
 from api.services.ldap_service import LDAPService
 from api.services.search_service import SearchService
+from api.services.fts_search_service import Fts5SearchService
+from api.services.typeahead_service import TypeaheadService
 from api.services.pdf_service import PDFService
 from api.services.cache_service import cache_service
 
@@ -14,6 +16,8 @@ __all__ = [
     'get_session',
     'LDAPService',
     'SearchService',
+    'Fts5SearchService',
+    'TypeaheadService',
     'PDFService',
     'cache_service',
 ] 
\ No newline at end of file
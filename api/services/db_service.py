@@ -4,23 +4,29 @@ from http.client import HTTPException
 from api.schemas.approval_schemas import ApprovalSchema, ApprovalView
 from api.schemas.ldap_schema import LDAPUser
 from api.utils.misc_utils import format_username
+from api.utils.json_utils import make_row_encoder
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from loguru import logger
 from aiocache import Cache, cached
-from sqlalchemy import select, update, insert
+from sqlalchemy import select, update, insert, exists, event, and_, or_
 from sqlalchemy import (create_engine, String, Integer, Float, Boolean, Text, LargeBinary, ForeignKey, DateTime,
-                        Enum , JSON, func, Enum as SQLEnum, literal, func, select, text, UniqueConstraint)
+                        Enum , JSON, func, Enum as SQLEnum, literal, func, select, text, UniqueConstraint, Index)
 from sqlalchemy.orm import declarative_base, selectinload, aliased
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, relationship, Session
 from api.schemas.boc_fund_mapping.boc_to_fund_mapping import BocMapping092000, BocMapping51140X, BocMapping51140E
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import select
 from sqlalchemy.orm import aliased
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone, timedelta
 from contextlib import contextmanager
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from api.schemas.enums import AssignedGroup, ItemStatus
 from api.utils.logging_utils import logger_init_ok
+import asyncio
+import base64
+import traceback
+import json
 import uuid
 import os
 import sqlite3
@@ -30,8 +36,46 @@ db_dir = os.path.join(os.path.dirname(__file__), '..', 'db')
 os.makedirs(db_dir, exist_ok=True)
 DATABASE_URL = "sqlite:///api/db/pras.db"
 
+# ────────────────────────────────────────────────────────────────────────────────
+# SQLITE PRAGMA PROFILES
+# ────────────────────────────────────────────────────────────────────────────────
+"""
+Applied to every pooled connection of both engines. The "production" profile puts the
+database in WAL mode so readers no longer block behind the approval writers, and gives
+writers a busy timeout instead of failing straight away with "database is locked".
+"""
+SQLITE_PRAGMA_PROFILES: dict[str, dict[str, str | int]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous":  "NORMAL",
+        "busy_timeout": 5000,           # ms
+        "mmap_size":    268435456,      # 256 MB
+        "cache_size":   -65536,         # negative = KiB, so 64 MB
+        "temp_store":   "MEMORY",
+    },
+}
+
+def get_sqlite_pragmas() -> dict[str, str | int]:
+    """Return the configured pragma profile with any overrides applied"""
+    profile = SQLITE_PRAGMA_PROFILES.get(settings.sqlite_pragma_profile)
+    if profile is None:
+        logger.warning(f"Unknown SQLite pragma profile '{settings.sqlite_pragma_profile}', using default")
+        profile = SQLITE_PRAGMA_PROFILES["default"]
+    return {**profile, **settings.sqlite_pragma_overrides}
+
+def apply_sqlite_pragmas(dbapi_conn, connection_record=None):
+    """Connection-init hook, also usable on a plain sqlite3 connection"""
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma, value in get_sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
 # Create engine and base
 engine = create_engine(DATABASE_URL, echo=False)  # PRAS = Purchase Request Approval System
+event.listen(engine, "connect", apply_sqlite_pragmas)
 Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine)
 
@@ -42,9 +86,36 @@ DATABASE_URL_ASYNC = "sqlite+aiosqlite:///api/db/pras.db"
 engine_async = create_async_engine(
     DATABASE_URL_ASYNC, 
     echo=False)
+event.listen(engine_async.sync_engine, "connect", apply_sqlite_pragmas)
 
 AsyncSessionLocal = sessionmaker(bind=engine_async, class_=AsyncSession)
 
+###################################################################################################
+# SQLITE PRAGMA SELF-CHECK
+###################################################################################################
+async def check_sqlite_pragmas() -> dict[str, str]:
+    """
+    Report the pragmas actually in effect on a pooled connection and warn
+    about any that differ from the configured profile.
+    """
+    expected = get_sqlite_pragmas()
+    in_effect: dict[str, str] = {}
+    async with engine_async.connect() as conn:
+        for pragma in SQLITE_PRAGMA_PROFILES["production"]:
+            result = await conn.exec_driver_sql(f"PRAGMA {pragma}")
+            in_effect[pragma] = str(result.scalar())
+
+    # synchronous and temp_store are reported as numbers
+    aliases = {"synchronous": {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"},
+               "temp_store":  {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"}}
+    for pragma, value in expected.items():
+        actual = aliases.get(pragma, {}).get(in_effect.get(pragma), in_effect.get(pragma))
+        if str(actual).lower() != str(value).lower():
+            logger.warning(f"SQLite pragma {pragma}={actual}, expected {value}")
+
+    logger_init_ok(f"SQLite profile '{settings.sqlite_pragma_profile}' in effect: {in_effect}")
+    return in_effect
+
 # dependency to hand out AsyncSession instances
 async def get_async_session() -> AsyncSession:
     async with AsyncSessionLocal() as async_session:
@@ -53,7 +124,9 @@ async def get_async_session() -> AsyncSession:
 # ────────────────────────────────────────────────────────────────────────────────
 # DATABASE SESSIONS
 # ────────────────────────────────────────────────────────────────────────────────
-# Context manager for database sessions
+# Context manager for database sessions.
+# Sync sessions are for worker threads only (search indexing, offline tools); request paths use
+# AsyncSession. The guard below reports any sync engine query made on the event loop thread.
 @contextmanager
 def get_session():
     db = SessionLocal()
@@ -62,6 +135,32 @@ def get_session():
     finally:
         db.close()
         
+# ────────────────────────────────────────────────────────────────────────────────
+# SYNC-ON-LOOP GUARD
+# ────────────────────────────────────────────────────────────────────────────────
+def _guard_sync_query_on_loop(conn, cursor, statement, parameters, context, executemany):
+    """before_cursor_execute on the sync engine: a running loop here means the loop is blocked"""
+    if settings.sync_db_on_loop == "off":
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # worker thread, nothing is blocked
+    
+    # First frame outside SQLAlchemy and this module is the offending caller
+    caller = next(
+        (f for f in reversed(traceback.extract_stack()[:-1])
+         if "sqlalchemy" not in f.filename and f.filename != __file__),
+        None,
+    )
+    where = f"{caller.filename}:{caller.lineno} in {caller.name}" if caller else "unknown caller"
+    msg = f"Synchronous DB query on the event loop thread ({where}): {statement[:120]}"
+    if settings.sync_db_on_loop == "raise":
+        raise RuntimeError(msg)
+    logger.warning(msg)
+
+event.listen(engine, "before_cursor_execute", _guard_sync_query_on_loop)
+
 @staticmethod
 def utc_now_truncated() -> datetime:
     now = datetime.now(timezone.utc)
@@ -72,6 +171,11 @@ def utc_now_truncated() -> datetime:
 # ────────────────────────────────────────────────────────────────────────────────
 class PurchaseRequestHeader(Base):
     __tablename__ = "purchase_request_headers"
+    # One IN_PROGRESS draft per requester (also created for existing databases by migrations/0006_draft_keepalive.sql)
+    __table_args__ = (
+        Index("ux_purchase_request_headers_draft", "requester", unique=True,
+              sqlite_where=text("submission_status = 'IN_PROGRESS'")),
+    )
     purchase_request_seq_id : Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     ID                     : Mapped[str] = mapped_column(String, unique=True, nullable=False)
     IRQ1_ID                : Mapped[Optional[str]] = mapped_column(String, unique=True, nullable=True)
@@ -85,6 +189,8 @@ class PurchaseRequestHeader(Base):
                                                           nullable=False,
                                                           server_default="IN_PROGRESS")
     created_time = mapped_column(DateTime(timezone=True), default=utc_now_truncated, nullable=False)
+    # Draft keep-alive, refreshed by /createNewID; the draft reclaimer ages drafts by it
+    touched_time = mapped_column(DateTime(timezone=True), default=utc_now_truncated, nullable=True)
 
     # 1️⃣ headers → line‐items
     pr_line_items      : Mapped[List[PurchaseRequestLineItem]] = relationship(
@@ -435,6 +541,55 @@ class WorkflowUser(Base):
     department = mapped_column(String, nullable=False)
     active = mapped_column(Boolean, nullable=False, default=False)
     
+# ────────────────────────────────────────────────────────────────────────────────
+# APPROVAL VIEW (denormalized, trigger maintained)
+# ────────────────────────────────────────────────────────────────────────────────
+"""
+One row per line item with its header fields copied in, exactly the ApprovalSchema columns.
+Never written by the app: the triggers in migrations/0003_approval_view.sql keep it in sync
+with pr_line_items and purchase_request_headers. Check or rebuild it offline with
+python -m api.utils.approval_view_check.
+"""
+class FlatApproval(Base):
+    __tablename__ = "approval_view"
+
+    UUID                   : Mapped[str] = mapped_column(String, primary_key=True)
+    purchase_request_id    : Mapped[str] = mapped_column(String, nullable=False)
+    IRQ1_ID                : Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    requester              : Mapped[str] = mapped_column(String, nullable=False)
+    CO                     : Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    datereq                : Mapped[str] = mapped_column(String)
+    orderType              : Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    itemDescription        : Mapped[str] = mapped_column(Text)
+    justification          : Mapped[str] = mapped_column(Text)
+    trainNotAval           : Mapped[bool] = mapped_column(Boolean, nullable=True)
+    needsNotMeet           : Mapped[bool] = mapped_column(Boolean, nullable=True)
+    budgetObjCode          : Mapped[str] = mapped_column(String)
+    fund                   : Mapped[str] = mapped_column(String)
+    priceEach              : Mapped[float] = mapped_column(Float)
+    totalPrice             : Mapped[float] = mapped_column(Float)
+    location               : Mapped[str] = mapped_column(String)
+    quantity               : Mapped[int] = mapped_column(Integer)
+    created_time           : Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    isCyberSecRelated      : Mapped[bool] = mapped_column(Boolean, nullable=True)
+    status                 : Mapped[ItemStatus] = mapped_column(
+                                SQLEnum(ItemStatus,
+                                       name="item_status", native_enum=False,
+                                       values_callable=lambda enum: [e.value for e in enum]
+                                ),
+                                nullable=True
+                              )
+
+# ────────────────────────────────────────────────────────────────────────────────
+# SEARCH INDEX QUEUE
+# ────────────────────────────────────────────────────────────────────────────────
+# Purchase requests to reindex, filled by triggers (migrations/0004_search_index_queue.sql)
+class SearchIndexQueue(Base):
+    __tablename__ = "search_index_queue"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq                 : Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    purchase_request_id : Mapped[str] = mapped_column(String, nullable=False)
 
 ###################################################################################################
 ## SEEDING JUSTIFICATION TEMPLATES
@@ -464,21 +619,116 @@ async def get_justification_templates(db: AsyncSession) -> dict[str, str]:
 ###################################################################################################
 # Get next  request id
 ###################################################################################################
-async def set_purchase_req_id(db: AsyncSession) -> str:
-    new_req = PurchaseRequestHeader(
-        ID="",
-        requester="PENDING",
-        datereq=utc_now_truncated().strftime("%Y-%m-%d"),
+async def set_purchase_req_id(db: AsyncSession, requester: str = "PENDING") -> str:
+    """
+    Insert a draft header for requester and return its ID. If the requester already has an
+    IN_PROGRESS draft (a concurrent call got there first), the unique draft index turns the
+    insert into a no-op and that draft's ID is returned instead.
+    """
+    now = utc_now_truncated()
+    seq_id = await db.scalar(
+        sqlite_insert(PurchaseRequestHeader)
+        .values(
+            ID=f"DRAFT-{uuid.uuid4()}",  # Unique placeholder until the seq id is known
+            requester=requester,
+            datereq=now.strftime("%Y-%m-%d"),
+            created_time=now,
+            touched_time=now,
+        )
+        .on_conflict_do_nothing()
+        .returning(PurchaseRequestHeader.purchase_request_seq_id)
     )
-    db.add(new_req)
-    await db.flush()
-    
-    purchase_request_id = f"LAWB{new_req.purchase_request_seq_id:04d}"
-    new_req.ID = purchase_request_id
-    
+    if seq_id is None:
+        return await get_draft_for_requester(db, requester)
+
+    purchase_request_id = f"LAWB{seq_id:04d}"
+    await db.execute(
+        update(PurchaseRequestHeader)
+        .where(PurchaseRequestHeader.purchase_request_seq_id == seq_id)
+        .values(ID=purchase_request_id)
+    )
+
     # Do not commit here, allow transaction to commit
     return purchase_request_id
 
+###################################################################################################
+# Get the draft (IN_PROGRESS) request owned by a requester
+###################################################################################################
+async def get_draft_for_requester(db: AsyncSession, requester: str) -> Optional[str]:
+    """Each requester owns at most one IN_PROGRESS header (ux_purchase_request_headers_draft)."""
+    stmt = (select(PurchaseRequestHeader.ID)
+            .where(PurchaseRequestHeader.requester == requester,
+                   PurchaseRequestHeader.submission_status == "IN_PROGRESS")
+            .order_by(PurchaseRequestHeader.purchase_request_seq_id.desc())
+            .limit(1))
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+###################################################################################################
+# Reserve a draft request ID for a requester
+###################################################################################################
+# A draft's keep-alive is refreshed at most this often, so most calls only read
+DRAFT_TOUCH_INTERVAL = timedelta(minutes=5)
+
+async def reserve_draft_id(db: AsyncSession, requester: str) -> str:
+    """
+    Return the requester's draft ID, creating one if needed. Only writes when a draft
+    is inserted or its touched_time is older than DRAFT_TOUCH_INTERVAL, so most
+    calls never ask SQLite for the write lock.
+    """
+    stale = or_(
+        PurchaseRequestHeader.touched_time.is_(None),
+        PurchaseRequestHeader.touched_time < utc_now_truncated() - DRAFT_TOUCH_INTERVAL,
+    )
+    stmt = (select(PurchaseRequestHeader.ID, stale.label("stale"))
+            .where(PurchaseRequestHeader.requester == requester,
+                   PurchaseRequestHeader.submission_status == "IN_PROGRESS"))
+    draft = (await db.execute(stmt)).first()
+    if draft is None:
+        return await set_purchase_req_id(db, requester=requester)
+
+    if draft.stale:
+        # Keep the draft alive while the requester is still using it
+        await db.execute(
+            update(PurchaseRequestHeader)
+            .where(PurchaseRequestHeader.ID == draft.ID)
+            .values(touched_time=utc_now_truncated())
+        )
+    return draft.ID
+
+###################################################################################################
+# Reclaim abandoned drafts
+###################################################################################################
+async def reclaim_abandoned_drafts(db: AsyncSession, ttl_hours: int) -> int:
+    """
+    Cancel IN_PROGRESS headers that have no line items and have not been touched
+    for ttl_hours. Cancelled rows keep their ID so LAWB numbers are never reused.
+    """
+    cutoff = utc_now_truncated() - timedelta(hours=ttl_hours)
+    has_line_items = exists().where(PurchaseRequestLineItem.purchase_request_id == PurchaseRequestHeader.ID)
+    last_touched = func.coalesce(PurchaseRequestHeader.touched_time, PurchaseRequestHeader.created_time)
+    stmt = (update(PurchaseRequestHeader)
+            .where(PurchaseRequestHeader.submission_status == "IN_PROGRESS",
+                   last_touched < cutoff,
+                   ~has_line_items)
+            .values(submission_status="CANCELLED"))
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount
+
+async def start_draft_reclaimer(interval_sec: int, ttl_hours: int):
+    """Reclaim abandoned drafts in a background task"""
+    logger_init_ok(f"Starting draft reclaimer with {interval_sec}s interval")
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                reclaimed = await reclaim_abandoned_drafts(session, ttl_hours)
+            if reclaimed:
+                logger.info(f"Reclaimed {reclaimed} abandoned draft request(s)")
+        except Exception as e:
+            logger.error(f"Error reclaiming abandoned drafts: {e}")
+        await asyncio.sleep(interval_sec)
+
 ###################################################################################################
 # Get last row in purchase_request_headers
 ###################################################################################################
@@ -521,16 +771,20 @@ async def get_last_row_any_status(db: AsyncSession) -> str:
 ###################################################################################################
 # Get all purchase requests
 ###################################################################################################
-def get_all_purchase_requests(session):
+async def get_all_purchase_requests(db: AsyncSession) -> List[PurchaseRequestHeader]:
     """Get all purchase requests"""
-    return session.query(PurchaseRequestHeader).all()
+    result = await db.execute(select(PurchaseRequestHeader))
+    return list(result.scalars().all())
 
 ###################################################################################################
 # Get approval by purchase request ID -- FOR SEARCHING ON APPROVAL "VIEW"
 ###################################################################################################
-def get_approval_by_id(session, purchase_request_id: str):
+async def get_approval_by_id(db: AsyncSession, purchase_request_id: str) -> Optional[Approval]:
     """Get approval for a given purchase request ID"""
-    return session.query(Approval).filter(Approval.purchase_request_id == purchase_request_id).first()
+    result = await db.execute(
+        select(Approval).where(Approval.purchase_request_id == purchase_request_id).limit(1)
+    )
+    return result.scalars().first()
 
 ###################################################################################################
 # Get justifications by ID
@@ -560,15 +814,14 @@ async def get_son_comments_by_id(
 ###################################################################################################
 # Get order types by ID
 ###################################################################################################
-def get_order_types(ID: str):
+async def get_order_types(db: AsyncSession, ID: str) -> list[str]:
     """Get order types by ID"""
-    with get_session() as session:
-        stmt = (
-            select(PurchaseRequestHeader.orderType)
-            .where(PurchaseRequestHeader.ID == ID)
-        )
-        results = session.execute(stmt).all()
-        return [row[0] for row in results if row[0]]
+    stmt = (
+        select(PurchaseRequestHeader.orderType)
+        .where(PurchaseRequestHeader.ID == ID)
+    )
+    results = (await db.execute(stmt)).all()
+    return [row[0] for row in results if row[0]]
 
 ###################################################################################################
 # Get next request ID
@@ -580,7 +833,7 @@ async def get_next_request_id() -> str:
     - Otherwise increment the last 4‑digit suffix
     """
     first_section = "LAWB"
-    async with get_session() as session:
+    async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(PurchaseRequestHeader.ID)
             .order_by(PurchaseRequestHeader.ID.desc())
@@ -619,47 +872,43 @@ ORM_Approval = (
     Approval
 )
 
+def _flat_approvals_stmt():
+    """Single-table select on approval_view, shaped like ApprovalSchema"""
+    av = aliased(FlatApproval)
+    stmt = select(
+        av.UUID,
+        av.purchase_request_id,  # This will be aliased to "ID"
+        av.IRQ1_ID,
+        av.requester,
+        av.CO,
+        av.datereq,
+        av.orderType,
+        av.itemDescription,
+        av.justification,
+        av.trainNotAval,
+        av.needsNotMeet,
+        av.budgetObjCode,
+        av.fund,
+        av.priceEach,
+        av.totalPrice,
+        av.location,
+        av.quantity,
+        av.created_time,  # This will be aliased to "createdTime"
+        av.isCyberSecRelated,
+        av.status,
+    )
+    return stmt, av
+
 async def fetch_flat_approvals(
     db: AsyncSession,
     ID: Optional[str] = None,
 ) -> List[ApprovalSchema]:
     
     logger.debug(f"Fetching flat approvals for ID: {ID}")
-    # alias each table for clarity
-    hdr = aliased(PurchaseRequestHeader)
-    li = aliased(PurchaseRequestLineItem)
-    
-    # build the statement to match ApprovalSchema structure
-    stmt = (
-        select(
-            # ApprovalSchema fields
-            li.UUID.label("UUID"),
-            hdr.ID.label("purchase_request_id"),  # This will be aliased to "ID"
-            hdr.IRQ1_ID.label("IRQ1_ID"),
-            hdr.requester.label("requester"),
-            hdr.CO.label("CO"),
-            hdr.datereq.label("datereq"),
-            hdr.orderType.label("orderType"),
-            li.itemDescription.label("itemDescription"),
-            li.justification.label("justification"),
-            li.trainNotAval.label("trainNotAval"),
-            li.needsNotMeet.label("needsNotMeet"),
-            li.budgetObjCode.label("budgetObjCode"),
-            li.fund.label("fund"),
-            li.priceEach.label("priceEach"),
-            li.totalPrice.label("totalPrice"),
-            li.location.label("location"),
-            li.quantity.label("quantity"),
-            li.created_time.label("created_time"),  # This will be aliased to "createdTime"
-            li.isCyberSecRelated.label("isCyberSecRelated"),
-            li.status.label("status"),
-        )
-        .select_from(li)
-        .join(hdr, li.purchase_request_id == hdr.ID)
-    )
+    stmt, av = _flat_approvals_stmt()
 
     if ID:
-        stmt = stmt.where(hdr.ID == ID)
+        stmt = stmt.where(av.purchase_request_id == ID)
     
     # execute the statement
     result = await db.execute(stmt)
@@ -668,6 +917,144 @@ async def fetch_flat_approvals(
     # Map each row to the ApprovalSchema
     return [ApprovalSchema(**r._asdict()) for r in rows]
 
+# DB rows -> ApprovalSchema-shaped dicts, skipping a second round of validation
+encode_approval_row = make_row_encoder(ApprovalSchema)
+
+###################################################################################################
+# STREAMING FLAT APPROVALS
+###################################################################################################
+async def stream_flat_approvals(
+    ID: Optional[str] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[dict]]:
+    """
+    Yield flat approvals in chunks straight off the DB cursor, so only one chunk is held in
+    memory at a time. Opens its own session: the generator outlives the request dependency
+    when it backs a StreamingResponse. Rows are trusted and encoded without validation.
+    """
+    stmt, av = _flat_approvals_stmt()
+    if ID:
+        stmt = stmt.where(av.purchase_request_id == ID)
+    stmt = stmt.order_by(av.created_time, av.UUID)
+    
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield [encode_approval_row(r) for r in partition]
+
+###################################################################################################
+# KEYSET PAGINATION OF FLAT APPROVALS
+###################################################################################################
+"""
+Pages are ordered newest first on (created_time, UUID) and the cursor is the key of the
+last row returned, so fetching page N costs the same as page 1 (no OFFSET scan). The
+cursor is opaque to the client: urlsafe base64 of a small JSON array.
+"""
+def encode_approval_cursor(created_time: datetime, line_item_uuid: str) -> str:
+    raw = json.dumps([created_time.isoformat(), line_item_uuid]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_approval_cursor(cursor: str) -> tuple[datetime, str]:
+    """Raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_time, line_item_uuid = json.loads(raw)
+        return datetime.fromisoformat(created_time), str(line_item_uuid)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def fetch_approval_page(
+    db: AsyncSession,
+    *,
+    limit: Optional[int],
+    cursor: Optional[str] = None,
+    ID: Optional[str] = None,
+    status: Optional[List[ItemStatus]] = None,
+    fund: Optional[str] = None,
+    requester: Optional[str] = None,
+    assigned_group: Optional[AssignedGroup] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> tuple[List[dict], Optional[str]]:
+    """
+    Return one page of flat approvals and the cursor for the next page (None on the last page).
+    limit=None returns every matching row as a single page.
+    date_from / date_to are inclusive calendar days on the line item created_time.
+    Rows are trusted and returned already encoded in ApprovalSchema's alias shape.
+    """
+    stmt, av = _flat_approvals_stmt()
+
+    if ID:
+        stmt = stmt.where(av.purchase_request_id == ID)
+    if status:
+        stmt = stmt.where(av.status.in_(status))
+    if fund:
+        stmt = stmt.where(av.fund == fund)
+    if requester:
+        stmt = stmt.where(av.requester == requester)
+    if assigned_group:
+        stmt = stmt.where(
+            exists().where(
+                PendingApproval.line_item_uuid == av.UUID,
+                PendingApproval.assigned_group == assigned_group.value,
+            )
+        )
+    if date_from:
+        stmt = stmt.where(av.created_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        stmt = stmt.where(av.created_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if cursor:
+        after_time, after_uuid = decode_approval_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                av.created_time < after_time,
+                and_(av.created_time == after_time, av.UUID < after_uuid),
+            )
+        )
+
+    stmt = stmt.order_by(av.created_time.desc(), av.UUID.desc())
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_approval_cursor(last.created_time, last.UUID)
+    
+    logger.debug(f"Fetched approval page: {len(rows)} rows, more={next_cursor is not None}")
+    return [encode_approval_row(r) for r in rows], next_cursor
+
+###################################################################################################
+# PURCHASE REQUEST IDS BY FILTER
+###################################################################################################
+async def fetch_purchase_request_ids(
+    db: AsyncSession,
+    *,
+    status: Optional[List[ItemStatus]] = None,
+    fund: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[str]:
+    """
+    Purchase requests with at least one line item matching every filter, oldest first.
+    Filters mean the same as in fetch_approval_page.
+    """
+    av = FlatApproval
+    stmt = select(av.purchase_request_id)
+    if status:
+        stmt = stmt.where(av.status.in_(status))
+    if fund:
+        stmt = stmt.where(av.fund == fund)
+    if date_from:
+        stmt = stmt.where(av.created_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        stmt = stmt.where(av.created_time < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    stmt = stmt.group_by(av.purchase_request_id).order_by(func.min(av.created_time), av.purchase_request_id)
+    return list((await db.scalars(stmt)).all())
+
 ###################################################################################################
 # INSERT LINE ITEM FINAL APPROVAL
 ###################################################################################################
@@ -926,6 +1313,61 @@ async def get_contracting_officer_by_id(db: AsyncSession, ID: str) -> str:
         logger.error(f"Error getting contracting officer by ID: {e}")
         return None
 		
+###################################################################################################
+# Schema migrations
+###################################################################################################
+def run_migrations() -> int:
+    """
+    Apply every api/db/migrations/NNNN_name.sql newer than PRAGMA user_version.
+    Each file runs in one transaction together with its user_version bump, so a
+    failed migration leaves the version untouched and re-running is a no-op.
+    Returns the schema version in effect.
+    """
+    with sqlite3.connect(settings.DATABASE_FILE_PATH) as conn:
+        apply_sqlite_pragmas(conn)
+        current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for path in sorted(settings.MIGRATIONS_DIR.glob("*.sql")):
+            version = int(path.name.split("_", 1)[0])
+            if version <= current_version:
+                continue
+            conn.executescript(
+                f"BEGIN;\n{path.read_text(encoding='utf-8')}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+            current_version = version
+            logger_init_ok(f"Applied migration {path.name}")
+
+    logger_init_ok(f"Database schema version {current_version}")
+    return current_version
+
+def add_missing_columns(conn: sqlite3.Connection) -> None:
+    """
+    create_all never alters a table that already exists: add any nullable model column an
+    older database lacks, so migrations and queries can rely on it.
+    """
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table.name})")}
+        for column in table.columns:
+            if existing and column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+                logger_init_ok(f"Added column {table.name}.{column.name}")
+
+def create_schema() -> None:
+    """Create all tables, run the trigger/seed SQL script, then apply pending migrations"""
+    Base.metadata.create_all(bind=engine)
+    
+    with sqlite3.connect(settings.DATABASE_FILE_PATH) as conn:
+        apply_sqlite_pragmas(conn)
+        add_missing_columns(conn)
+        cur = conn.cursor()
+        with open(settings.SQL_SCRIPT_PATH, "r") as f:
+            cur.executescript(f.read())
+            
+    logger_init_ok("SQL script executed successfully")
+    
+    run_migrations()
+
 ###################################################################################################
 # Initialize database
 ###################################################################################################
@@ -957,15 +1399,8 @@ async def init_db():
     ]
 
     try:
-        # Create (sync) all tables
-        Base.metadata.create_all(bind=engine)
-        
-        with sqlite3.connect(settings.DATABASE_FILE_PATH) as conn:
-            cur = conn.cursor()
-            with open(settings.SQL_SCRIPT_PATH, "r") as f:
-                cur.executescript(f.read())
-                
-        logger_init_ok("SQL script executed successfully")
+        # Tables, SQL script and migrations all go through sync drivers, so run them off the loop
+        await asyncio.to_thread(create_schema)
                 
         # Seed workflow users
         async for session in get_async_session():
@@ -1058,12 +1493,13 @@ async def get_uuid_by_id(db_session: AsyncSession, ID: str) -> Optional[str]:
 ###################################################################################################
 # GET USERNAMES
 ###################################################################################################
-def get_usernames(db_session: Session, prefix: str):
+async def get_usernames(db: AsyncSession, prefix: str) -> list[str]:
     """
     Get usernames that start with the given prefix.
     Returns a list of usernames.
     """
-    results = db_session.query(Approval.requester).filter(Approval.requester.like(f"{prefix}%")).distinct().all()
+    stmt = select(Approval.requester).where(Approval.requester.like(f"{prefix}%")).distinct()
+    results = (await db.execute(stmt)).all()
     return [row[0] for row in results]
 
 ###################################################################################################
@@ -0,0 +1,231 @@
+######################################################################################
+# Name: FTS5 SEARCH SERVICE
+# Description: SQLite FTS5 search backend, same contract as SearchService
+#
+# approval_fts (migrations/0005_approval_fts.sql) lives in pras.db and is maintained by
+# triggers on approval_view, so it changes in the same transaction as the data and needs
+# no separate index directory. Selected with settings.search_backend = "fts5".
+#
+# Query syntax is plain words (each one prefix matched, any word may match). The Whoosh
+# field:value and range syntax is not available on this backend.
+
+from loguru import logger
+import api.services.db_service as dbas
+from api.services.db_service import get_session
+from api.services.search_service import (
+    FACET_FIELDS, INDEX_META_FILE, SORT_FIELDS, approval_schema, make_document_mapper, _hit_to_dict,
+)
+from api.utils.logging_utils import logger_init_ok
+from api.settings import settings
+from sqlalchemy import delete, event, func, select, text
+from sqlalchemy.orm.session import Session
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+import asyncio
+import os
+import re
+import time
+
+# approval_view columns that back each facet, and each sort key
+FACET_COLUMNS = {
+    "status": "status",
+    "fund": "fund",
+    "budgetObjCode": "budgetObjCode",
+    "location": "location",
+}
+SORT_COLUMNS = {
+    "totalPrice": "av.totalPrice",
+    "createdTime": "av.created_time",
+}
+assert FACET_COLUMNS.keys() == FACET_FIELDS.keys() and SORT_COLUMNS.keys() == SORT_FIELDS.keys()
+
+# Rows sharing approval_view's rowid with their full text entry
+MATCH_SOURCE = "approval_fts f JOIN approval_view av ON av.rowid = f.rowid"
+
+# Whoosh stored fields = what a hit returns on either backend
+STORED_FIELDS = set(approval_schema.stored_names())
+
+def to_match_expression(query: str) -> Optional[str]:
+    """User text -> FTS5 MATCH expression; quoting every token means input can never be a syntax error"""
+    tokens = re.findall(r"\w+", query)
+    if not tokens:
+        return None
+    return " OR ".join(f'"{token}"*' for token in tokens)
+
+class Fts5SearchService:
+    """
+    SQLite FTS5 search over approval_view.
+    - Index maintained by triggers, transactional with the data
+    - Queries on a bounded thread pool with sync sessions
+    - Same execute_search / execute_faceted_search results as the Whoosh backend
+    """
+
+    def __init__(self, session_factory=get_session, index_dir: str = "indexdir"):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=settings.search_threads, thread_name_prefix="search")
+        self._discard_task: Optional[asyncio.Task] = None
+
+        # The Whoosh index stops following the queue while this backend runs; make it
+        # rebuild instead of trusting its watermark if the backend is switched back
+        whoosh_meta = os.path.join(index_dir, INDEX_META_FILE)
+        if os.path.exists(whoosh_meta):
+            os.remove(whoosh_meta)
+
+        self._discard_index_queue()
+        with self.session_factory() as session:
+            count = session.scalar(text("SELECT count(*) FROM approval_fts"))
+        logger_init_ok(f"FTS5 search backend ready ({count} documents)")
+
+        event.listen(Session, "after_commit", self.after_commit)
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # SEARCH
+    # ────────────────────────────────────────────────────────────────────────────
+    def _select_sql(self, source: str, where: str, order_by: str) -> str:
+        return f"""
+            SELECT av.*, li.addComments
+            FROM {source}
+            LEFT JOIN pr_line_items li ON li.UUID = av.UUID
+            {where}
+            ORDER BY {order_by}
+            LIMIT :limit OFFSET :offset
+        """
+
+    def _run(self, session, sql: str, params: Dict[str, Any]) -> List[Dict]:
+        # Type the textual columns so dates and statuses come back as on the Whoosh path
+        stmt = text(sql).columns(*dbas.FlatApproval.__table__.c, dbas.PurchaseRequestLineItem.addComments)
+        result = session.execute(stmt, params)
+        to_document = make_document_mapper(result.keys())
+        hits = []
+        for row in result:
+            doc = _hit_to_dict(to_document(row))
+            hits.append({k: v for k, v in doc.items() if k in STORED_FIELDS})
+        return hits
+
+    def execute_search(self, query: str, db: Session = None, limit: int = 10) -> List[Dict]:
+        """Prefix search across the indexed text fields, best bm25 rank first."""
+        match = to_match_expression(query)
+        if match is None:
+            return []
+        sql = self._select_sql(MATCH_SOURCE, "WHERE approval_fts MATCH :match", "f.rank")
+        with self.session_factory() as session:
+            search_results = self._run(session, sql, {"match": match, "limit": limit, "offset": 0})
+        logger.info(f"Search results for '{query}': {len(search_results)} items found")
+        return search_results
+
+    def execute_faceted_search(
+        self,
+        query: str,
+        page: int = 1,
+        pagelen: int = 25,
+        sort: Optional[str] = None,
+        reverse: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Same result shape as SearchService.execute_faceted_search."""
+        started = time.perf_counter()
+
+        conditions, params = [], {}
+        match = to_match_expression(query)
+        if match is not None:
+            conditions.append("approval_fts MATCH :match")
+            params["match"] = match
+        for name, value in (filters or {}).items():
+            if value:
+                conditions.append(f"av.{FACET_COLUMNS[name]} = :f_{name}")
+                params[f"f_{name}"] = value
+        source = MATCH_SOURCE if match is not None else "approval_view av"
+
+        if sort:
+            order_by = f"{SORT_COLUMNS[sort]} {'DESC' if reverse else 'ASC'}, av.UUID"
+        elif match is not None:
+            order_by = "f.rank"
+        else:
+            order_by = "av.created_time DESC, av.UUID"
+
+        def where(*extra: str) -> str:
+            clauses = [*conditions, *extra]
+            return ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+        with self.session_factory() as session:
+            total = session.scalar(text(f"SELECT count(*) FROM {source} {where()}"), params)
+            pages = max(1, -(-total // pagelen))
+            page = min(page, pages)
+            results = self._run(
+                session,
+                self._select_sql(source, where(), order_by),
+                {**params, "limit": pagelen, "offset": (page - 1) * pagelen},
+            )
+            facets = {}
+            for name, column in FACET_COLUMNS.items():
+                rows = session.execute(
+                    text(
+                        f"SELECT av.{column}, count(*) AS n FROM {source} "
+                        f"{where(f'av.{column} IS NOT NULL')} GROUP BY av.{column} ORDER BY n DESC"
+                    ),
+                    params,
+                ).all()
+                facets[name] = {value: n for value, n in rows}
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > settings.search_latency_target_ms:
+            logger.warning(
+                f"Faceted search over latency target: {elapsed_ms:.0f}ms > {settings.search_latency_target_ms}ms "
+                f"(query='{query}', total={total}, page={page}, sort={sort})"
+            )
+        return {"total": total, "page": page, "pagelen": pagelen, "pages": pages, "results": results, "facets": facets}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """No result cache on this backend: approval_fts changes inside every committing transaction"""
+        return {"backend": "fts5", "enabled": False}
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.execute_search, query, None, limit)
+
+    async def faceted_search(self, query: str, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.execute_faceted_search, query, **kwargs))
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # MAINTENANCE
+    # ────────────────────────────────────────────────────────────────────────────
+    def rebuild_index(self):
+        """Repopulate approval_fts from approval_view (only needed after manual edits)."""
+        with self.session_factory() as session:
+            session.execute(text("DELETE FROM approval_fts"))
+            session.execute(text("""
+                INSERT INTO approval_fts (rowid, ID, IRQ1_ID, CO, requester, itemDescription, justification,
+                                          addComments, budgetObjCode, fund, location, status)
+                SELECT av.rowid, av.purchase_request_id, av.IRQ1_ID, av.CO, av.requester, av.itemDescription,
+                       av.justification, li.addComments, av.budgetObjCode, av.fund, av.location, av.status
+                FROM approval_view av
+                LEFT JOIN pr_line_items li ON li.UUID = av.UUID
+            """))
+            session.execute(text("INSERT INTO approval_fts (approval_fts) VALUES ('optimize')"))
+            session.commit()
+        logger.info("FTS5 search index rebuilt successfully")
+
+    async def start_index_maintenance(self, interval_sec: int):
+        """FTS5 merges its own b-tree segments as it writes (automerge); nothing to schedule."""
+        logger_init_ok("FTS5 search backend merges segments itself, no maintenance task")
+
+    async def flush(self):
+        """Nothing to wait for: triggers update approval_fts inside the committing transaction."""
+
+    def after_commit(self, session):
+        """search_index_queue only feeds the Whoosh backend; keep it from growing while FTS5 is active."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._discard_task is None or self._discard_task.done():
+            self._discard_task = loop.create_task(asyncio.to_thread(self._discard_index_queue))
+
+    def _discard_index_queue(self):
+        with self.session_factory() as session:
+            last_seq = session.scalar(select(func.max(dbas.SearchIndexQueue.seq)))
+            if last_seq is not None:
+                session.execute(delete(dbas.SearchIndexQueue).where(dbas.SearchIndexQueue.seq <= last_seq))
+                session.commit()
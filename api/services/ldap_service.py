@@ -303,33 +303,9 @@ class LDAPService:
                 size_limit=10
             )
 
-            if conn.entries:
-                # Find sid for the user if username is provided
-                target_sid = None
-                if username and username in user_sids:
-                    # Get the first sid for this user
-                    target_sid = next(iter(user_sids[username]), None)
-                
-                logger.info(f"USER_FOUND: target_sid={target_sid}, username={username}, user_sids={dict(user_sids)}")
-                emit_async("USER_FOUND", {
-                    "event": "USER_FOUND",
-                    "status_code": "200",
-                    "message": "User found for query",
-                }, to=target_sid)  # target specific user if sid found
-                return [e.sAMAccountName.value for e in conn.entries]
-            else:
-                # Find sid for the user if username is provided
-                target_sid = None
-                if username and username in user_sids:
-                    # Get the first sid for this user
-                    target_sid = next(iter(user_sids[username]), None)
-                
-                emit_async("NO_USER_FOUND", {   
-                    "event": "NO_USER_FOUND",
-                    "status_code": "404",
-                    "message": "No user found for query",
-                }, to=target_sid)  # target specific user if sid found
-                return []
+            usernames = [e.sAMAccountName.value for e in conn.entries]
+            self.notify_username_lookup(bool(usernames), username)
+            return usernames
         except Exception as e:
             logger.error(f"Error getting username: {e}")
             # Find sid for the user if username is provided
@@ -341,6 +317,53 @@ class LDAPService:
             emit_async("ERROR", {"message": f"LDAP error: {e}", "status_code": "500"}, to=target_sid)
             return ["Error"]
         
+    def notify_username_lookup(self, found: bool, username: str = None):
+        """Tell the requesting user's socket whether a username lookup matched anything"""
+        # Find sid for the user if username is provided
+        target_sid = None
+        if username and username in user_sids:
+            # Get the first sid for this user
+            target_sid = next(iter(user_sids[username]), None)
+
+        if found:
+            logger.info(f"USER_FOUND: target_sid={target_sid}, username={username}, user_sids={dict(user_sids)}")
+            emit_async("USER_FOUND", {
+                "event": "USER_FOUND",
+                "status_code": "200",
+                "message": "User found for query",
+            }, to=target_sid)  # target specific user if sid found
+        else:
+            emit_async("NO_USER_FOUND", {
+                "event": "NO_USER_FOUND",
+                "status_code": "404",
+                "message": "No user found for query",
+            }, to=target_sid)  # target specific user if sid found
+
+    #-------------------------------------------------------------------------------------
+    # DIRECTORY SNAPSHOT --- every sAMAccountName under the LAWB OU, for typeahead
+    #-------------------------------------------------------------------------------------
+    def _fetch_directory_usernames_sync(self, page_size: int = 500) -> List[str]:
+        conn = self.get_service_connection()
+        entries = conn.extend.standard.paged_search(
+            search_base='OU=LAWB,OU=USCOURTS,DC=ADU,DC=DCN',
+            search_filter='(&(objectClass=user)(sAMAccountName=*))',
+            search_scope=SUBTREE,
+            attributes=['sAMAccountName'],
+            paged_size=page_size,
+            generator=True,
+        )
+        usernames = []
+        for entry in entries:
+            if entry.get("type") != "searchResEntry":
+                continue
+            name = entry["attributes"].get("sAMAccountName")
+            if isinstance(name, list):  # no schema loaded -> every attribute is multi-valued
+                name = name[0] if name else None
+            # Computer accounts are users too; their names end in "$"
+            if name and not name.endswith("$"):
+                usernames.append(name)
+        return usernames
+
     ########################################################################################
     # FETCH USERNAMES SYNCHRONOUSLY
     ########################################################################################
@@ -352,6 +375,10 @@ class LDAPService:
     def fetch_usernames(self, query: str, username: str = None) -> list[str]:
         return self._fetch_usernames_sync(query, username)
     
+    @run_in_thread
+    def fetch_directory_usernames(self) -> list[str]:
+        return self._fetch_directory_usernames_sync()
+    
     @run_in_thread
     def check_user_membership(self, username: str) -> dict[str, bool]:
         return self._get_membership_sync(username)
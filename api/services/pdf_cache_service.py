@@ -0,0 +1,138 @@
+######################################################################################
+# Name: PDF RENDER CACHE
+# Description: Content-addressed cache of rendered statement-of-need PDFs
+#
+# A render is keyed by the sha256 of everything _make_purchase_request_pdf reads (the
+# printed row fields, order type, CO, final approver and timestamp) plus SON_TEMPLATE_VERSION.
+# Any change to an input produces a new key, so entries never need invalidating; old
+# ones simply stop being read and age out under the size bound (least recently used first).
+
+from loguru import logger
+from pathlib import Path
+from typing import Any, Dict, Optional
+from uuid import uuid4
+import hashlib
+import json
+import os
+import threading
+
+# Bump when the statement-of-need layout changes so existing renders are not reused
+SON_TEMPLATE_VERSION = 1
+
+def render_cache_key(inputs: Dict[str, Any]) -> str:
+    """sha256 of the render inputs in a canonical JSON form"""
+    canonical = json.dumps(
+        {"template": SON_TEMPLATE_VERSION, **inputs},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def write_atomic(path: Path, data: bytes):
+    """Write via a uniquely named temp file and rename, so readers see the old or the new file, never a partial one"""
+    tmp_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+class PdfRenderCache:
+    """
+    <sha256>.pdf files in cache_dir, bounded to max_bytes.
+    Thread-safe: lookups and stores run on worker threads.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # Leftovers from writes that died before their rename
+        for tmp in self.cache_dir.glob("*.tmp"):
+            tmp.unlink(missing_ok=True)
+        self._sizes: Dict[str, int] = {p.stem: p.stat().st_size for p in self.cache_dir.glob("*.pdf")}
+
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        data = None
+        with self._lock:
+            known = key in self._sizes
+        if known:
+            try:
+                os.utime(path)  # mtime doubles as the LRU clock
+                data = path.read_bytes()
+            except FileNotFoundError:
+                # Evicted between the lookup and the read
+                with self._lock:
+                    self._sizes.pop(key, None)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_seconds += self._average_render_seconds()
+        return data
+
+    def put(self, key: str, data: bytes, render_seconds: float) -> Path:
+        """Store a finished render (temp file + rename, never a partial file) and evict down to max_bytes."""
+        path = self.path_for(key)
+        write_atomic(path, data)
+        with self._lock:
+            self._sizes[key] = path.stat().st_size
+            self.renders += 1
+            self.render_seconds += render_seconds
+            self._evict_locked(keep=key)
+        return path
+
+    def _average_render_seconds(self) -> float:
+        return self.render_seconds / self.renders if self.renders else 0.0
+
+    def _evict_locked(self, keep: str):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def mtime(key: str) -> float:
+            try:
+                return self.path_for(key).stat().st_mtime
+            except FileNotFoundError:
+                return 0.0
+
+        evicted = 0
+        for key in sorted((k for k in self._sizes if k != keep), key=mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                self.path_for(key).unlink(missing_ok=True)
+            except OSError as e:
+                # Windows: still open by a reader; try again next time
+                logger.debug(f"PDF cache could not evict {key}: {e}")
+                continue
+            total -= self._sizes.pop(key)
+            evicted += 1
+        logger.info(f"PDF cache evicted {evicted} file(s), {total / (1024 * 1024):.1f} MB kept")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._sizes),
+                "mb": round(sum(self._sizes.values()) / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "avg_render_seconds": round(self._average_render_seconds(), 3),
+                "saved_render_seconds": round(self.saved_seconds, 2),
+            }
@@ -0,0 +1,106 @@
+######################################################################################
+# Name: PDF LAYOUT
+# Description: Fonts, styles and the seal for the statement of need, loaded once per process
+#
+# Parsing the Play TTFs, building the sample stylesheet and decoding the seal PNG used to
+# happen on every render. get_layout() does it the first time it is called in a process
+# (render workers call it from their initializer) and every later render reuses the result.
+# Everything here is only read while rendering, so renders on threads can share it too;
+# flowables hold per-document layout state and are still created per render.
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import TableStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import threading
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+FONT_FILES = {
+    "Play": PROJECT_ROOT / "src/assets/fonts/Play-Regular.ttf",
+    "Play-Bold": PROJECT_ROOT / "src/assets/fonts/Play-Bold.ttf",
+}
+LOGO_PATH = PROJECT_ROOT / "src/assets/seal_no_border.png"
+
+LOGO_WIDTH = LOGO_HEIGHT = 0.85 * inch
+HEADER_GAP = 6  # points of breathing room under the seal
+
+LINE_ITEM_HEADINGS = ["BOC","Fund","Location","Description","Qty","Price Each","Total Price","Statement of Need/Justification"]
+LINE_ITEM_COL_WIDTHS = [50,60,60,180,30,50,60,120]
+
+LEGAL_10_PERCENT_TEXT = (
+    '<font name="Play">*This statement of need approved with a 10% or $100 allowance, whichever is lower, '
+    'for any additional cost over the estimated amount.</font>'
+)
+
+@dataclass(frozen=True)
+class PdfLayout:
+    header_style: ParagraphStyle
+    cell_style: ParagraphStyle
+    total_style: ParagraphStyle
+    line_table_style: TableStyle
+    total_table_style: TableStyle
+    logo: ImageReader
+
+_layout: Optional[PdfLayout] = None
+_layout_lock = threading.Lock()
+
+def get_layout() -> PdfLayout:
+    """This process's layout, built on first use"""
+    global _layout
+    if _layout is None:
+        with _layout_lock:
+            if _layout is None:
+                _layout = _build_layout()
+    return _layout
+
+def _build_layout() -> PdfLayout:
+    #— fonts
+    for name, path in FONT_FILES.items():
+        pdfmetrics.registerFont(TTFont(name, str(path)))
+
+    #— styles
+    normal = ParagraphStyle("PlayNormal", parent=getSampleStyleSheet()["Normal"], fontName="Play")
+    header_style = ParagraphStyle("Header", parent=normal, fontSize=9, leading=10, fontName="Play-Bold")
+
+    #— table styles (Table.setStyle only reads the commands)
+    line_table_style = TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#EEEEEE")),
+        ("FONTNAME", (0,0), (-1,0), "Play-Bold"),
+        ("FONTSIZE", (0,0), (-1,0), 8),
+        ("ALIGN",    (0,0), (-1,0), "CENTER"),
+        ("GRID",     (0,0), (-1,-1), 1, colors.gray),
+        ("FONTSIZE", (0,1), (-1,-1), 9),
+        ("VALIGN",   (0,0), (-1,-1), "TOP"),
+        ("ALIGN",    (4,1), (6,-1), "RIGHT"),
+        ("LEFTPADDING",  (0,0), (-1,-1), 2),
+        ("RIGHTPADDING", (0,0), (-1,-1), 6),
+        ("TOPPADDING",   (0,0), (-1,-1), 6),
+        ("BOTTOMPADDING",(0,0),(-1,-1), 6),
+    ])
+    total_table_style = TableStyle([
+        ("LINEABOVE",       (0, 0), (-1, 0), 1, colors.gray),
+        ("ALIGN",           (1, 0), (1, 0), "RIGHT"),
+        ("LEFTPADDING",     (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING",    (0, 0), (-1, -1), 4),
+        ("TOPPADDING",      (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING",   (0, 0), (-1, -1), 2),
+    ])
+
+    #— seal, decoded once (ImageReader keeps the pixel data after the first draw)
+    logo = ImageReader(str(LOGO_PATH))
+
+    return PdfLayout(
+        header_style=header_style,
+        cell_style=ParagraphStyle("Cell", parent=normal, fontSize=9, leading=11, fontName="Play"),
+        total_style=ParagraphStyle("TotalValue", parent=header_style, alignment=TA_RIGHT),
+        line_table_style=line_table_style,
+        total_table_style=total_table_style,
+        logo=logo,
+    )
@@ -0,0 +1,146 @@
+######################################################################################
+# Name: PDF RENDER ENGINE
+# Description: Statement of need rendering on a warm process pool
+#
+# reportlab layout is pure Python and holds the GIL, so renders on threads serialize with
+# each other and with the event loop. Here each render runs in a worker process that has
+# loaded the PDF layout (pdf_layout) and done one throwaway render at start.
+#   - At most pdf_render_max_pending renders queued or running; further callers wait
+#     up to pdf_render_queue_wait_sec for a slot, then get 503
+#   - Only pdf_render_workers jobs are handed to the pool at once, the rest wait here, so
+#     pdf_render_timeout_sec times the render itself and never time spent queued
+#   - A render exceeding it fails with 504 and the pool is replaced, its processes killed,
+#     so a stuck worker cannot hold a slot for later jobs
+#   - pdf_render_workers = 0 renders on a thread instead (development, tests)
+
+from loguru import logger
+from api.utils.logging_utils import logger_init_ok
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from fastapi import HTTPException
+from io import BytesIO
+from typing import Optional
+import asyncio
+import time
+
+@dataclass(frozen=True)
+class RenderSpec:
+    """Everything one statement of need render needs; plain data, so it pickles to a worker."""
+    rows: list[dict]
+    is_cyber: bool = False
+    use_comments: bool = False
+    comments: list[str] = field(default_factory=list)
+    order_type: Optional[str] = None
+    contracting_officer: Optional[str] = None
+    final_approved: Optional[str] = None
+    final_approved_at: Optional[datetime] = None
+
+def render(spec: RenderSpec) -> tuple[bytes, float]:
+    """Render spec in memory; returns the PDF and the render time in seconds"""
+    from api.services.pdf_service import PDFService
+
+    started = time.perf_counter()
+    buffer = BytesIO()
+    PDFService._make_purchase_request_pdf(output=buffer, **{f.name: getattr(spec, f.name) for f in fields(spec)})
+    return buffer.getvalue(), time.perf_counter() - started
+
+_WARMUP_ROW = {
+    "purchase_request_id": "WARMUP", "IRQ1_ID": "", "requester": "", "datereq": "2025-01-01",
+    "budgetObjCode": "", "fund": "", "location": "", "itemDescription": "", "justification": "",
+    "quantity": 1, "priceEach": 0.0, "totalPrice": 0.0, "status": "NEW REQUEST",
+}
+
+def _init_worker():
+    # Fonts, styles and the seal once per process, then one throwaway render for the rest of reportlab
+    from api.services.pdf_layout import get_layout
+
+    get_layout()
+    render(RenderSpec(rows=[_WARMUP_ROW]))
+
+def _ready() -> bool:
+    return True
+
+def _kill_pool(executor: ProcessPoolExecutor):
+    """Shut executor down and kill its processes, including one stuck in a render"""
+    terminate_workers = getattr(executor, "terminate_workers", None)  # Python 3.14+
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    # Earlier versions only offer shutdown(), which lets a stuck render run on forever.
+    # _processes ({pid: Process}) is private, so it is read defensively: without it the
+    # stuck process is left to finish on its own, as shutdown() alone would.
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+class PdfRenderEngine:
+    def __init__(self, workers: int, max_pending: int, queue_wait_sec: float, timeout_sec: float):
+        self.workers = workers
+        self.queue_wait_sec = queue_wait_sec
+        self.timeout_sec = timeout_sec
+        self._slots = asyncio.Semaphore(max_pending)
+        # One per worker: a job submitted to the pool starts running right away
+        self._running = asyncio.Semaphore(max(workers, 1))
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def _replace_pool(self, old: Optional[ProcessPoolExecutor], reason: str):
+        """Swap in a fresh pool and kill old's processes; a no-op if old was already replaced"""
+        if old is not self._executor:
+            return
+        logger.warning(f"Replacing PDF render pool: {reason}")
+        self._executor = self._new_pool()
+        if old is not None:
+            _kill_pool(old)
+
+    async def start(self):
+        """Spawn and warm every worker now instead of on the first download"""
+        if self.workers <= 0:
+            logger_init_ok("PDF render engine using threads (pdf_render_workers = 0)")
+            return
+        started = time.perf_counter()
+        self._executor = self._new_pool()
+        loop = asyncio.get_running_loop()
+        # Pool processes are started on demand, one per submitted job, until max_workers
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ready) for _ in range(self.workers)))
+        logger_init_ok(f"PDF render engine ready: {self.workers} worker process(es) in {time.perf_counter() - started:.2f}s")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, spec: RenderSpec) -> tuple[bytes, float]:
+        """Render spec on the pool; returns the PDF and the render time measured in the worker"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_wait_sec)
+        except asyncio.TimeoutError:
+            logger.warning(f"PDF render queue full, rejected render of {spec.rows[0].get('purchase_request_id')}")
+            raise HTTPException(status_code=503, detail="PDF renderer is busy, try again shortly")
+
+        try:
+            if self.workers <= 0:
+                return await asyncio.wait_for(asyncio.to_thread(render, spec), timeout=self.timeout_sec)
+            async with self._running:
+                if self._executor is None:
+                    self._executor = self._new_pool()
+                executor = self._executor
+                loop = asyncio.get_running_loop()
+                try:
+                    future = loop.run_in_executor(executor, render, spec)
+                    return await asyncio.wait_for(future, timeout=self.timeout_sec)
+                except asyncio.TimeoutError:
+                    self._replace_pool(executor, f"render exceeded {self.timeout_sec}s")
+                    raise
+                except BrokenProcessPool:
+                    self._replace_pool(executor, "a worker process died")
+                    raise
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="PDF render timed out")
+        finally:
+            self._slots.release()
@@ -3,20 +3,16 @@ from api.schemas.enums import ItemStatus
 from api.services.progress_tracker.steps.submit_request_steps import SubmitRequestStepName
 from fastapi import HTTPException
 from reportlab.lib.pagesizes import LETTER
-from reportlab.lib import colors
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    SimpleDocTemplate, Paragraph, Spacer, Table
 )
 
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_RIGHT, TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.units import inch
 
 from datetime import datetime, date
 from loguru import logger
 from pathlib import Path
+from typing import BinaryIO
 from api.schemas.comment_schemas import SonCommentSchema
 import api.services.db_service as dbas
 from datetime import datetime
@@ -28,28 +24,62 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from api.services.progress_tracker.steps.download_steps import DownloadStepName
 from api.services.progress_tracker.steps.submit_request_steps import SubmitRequestStepName
 from api.services.progress_tracker.progress_manager import get_active_tracker, get_approval_tracker, get_download_tracker, get_submit_request_tracker, ProgressTrackerType
+from api.services.pdf_cache_service import PdfRenderCache, render_cache_key, write_atomic
+from api.services.pdf_render_engine import PdfRenderEngine, RenderSpec
+import api.services.pdf_layout as pdf_layout
+from api.settings import settings
 
 def get_sio_events():
     import api.services.socketio_server.sio_events as sio_events
     return sio_events
 
+# Row fields the statement of need prints: the line item columns of every row, and the
+# header block, which is read from the first row only
+PRINTED_LINE_FIELDS = (
+    "budgetObjCode", "fund", "location", "itemDescription", "quantity", "priceEach", "totalPrice", "justification",
+)
+PRINTED_HEADER_FIELDS = ("purchase_request_id", "IRQ1_ID", "requester", "datereq", "orderType", "status")
+
+def printed_rows(rows: list[dict]) -> list[dict]:
+    """
+    rows cut down to PRINTED_*_FIELDS, with the status as its printed value. The submit path's
+    rows and fetch_flat_approvals' rows differ in everything else (UUIDs, created_time, enum
+    vs str status), so this is what the render and its cache key are built from.
+    """
+    printed = [{f: r[f] for f in PRINTED_LINE_FIELDS if f in r} for r in rows]
+    printed[0].update({f: rows[0][f] for f in PRINTED_HEADER_FIELDS if f in rows[0]})
+    if printed[0].get("status") is not None:
+        printed[0]["status"] = ItemStatus(printed[0]["status"]).value
+    return printed
+
 class PDFService:
     def __init__(self):
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
+        self.render_cache = PdfRenderCache(
+            settings.PDF_OUTPUT_FOLDER / "son_cache",
+            max_bytes=settings.pdf_cache_max_mb * 1024 * 1024,
+        )
+        self.render_engine = PdfRenderEngine(
+            workers=settings.pdf_render_workers,
+            max_pending=settings.pdf_render_max_pending,
+            queue_wait_sec=settings.pdf_render_queue_wait_sec,
+            timeout_sec=settings.pdf_render_timeout_sec,
+        )
     """
-    Generate a purchase request PDF.
+    Generate a purchase request PDF in memory.
 
     Args:
         ID (str): The ID of the purchase request.
         is_cyber (bool): Whether the request is cybersecurity related.
         payload (dict): The payload of the purchase request.
         comments (list[str]): The comments of the purchase request.
+        track_progress (bool): Report steps to the active progress tracker (off for bulk exports).
 
     Returns:
-        Path: The path to the generated PDF.
+        bytes: The PDF document.
     """
-    async def create_pdf(
+    async def create_pdf_bytes(
         self,
         ID: str,
         db: AsyncSession,
@@ -57,9 +87,10 @@ class PDFService:
         comments: list[str] | None = None,
         is_cyber: bool = False,
         current_user = None,
-    ) -> Path:
+        track_progress: bool = True,
+    ) -> bytes:
         logger.info(f"#####################################################")
-        logger.info("create_pdf()")
+        logger.info("create_pdf_bytes()")
         logger.info(f"#####################################################")
         
         if not ID:
@@ -70,7 +101,7 @@ class PDFService:
         if current_user:
             sid = get_sio_events().get_user_sid(current_user)
         
-        tracker = get_active_tracker()
+        tracker = get_active_tracker() if track_progress else None
         
         # Init local trackers to prevent error
         download_tracker = None
@@ -122,9 +153,6 @@ class PDFService:
         # Turn Pydantic models into dicts
         rows = [row.model_dump() for row in rows]
 
-        # 2️⃣ Determine if any line items are cyber‐related
-        is_cyber = any(r.get("isCyberSecRelated") for r in rows)
-        
         # ------------------------------------------------------------------------
         # Build justifcation template if true for trainNotAval or needsNotMeet
         # Fetch additional comment fr   om database if present
@@ -198,7 +226,7 @@ class PDFService:
         if additional_comments:
             comment_arr.extend(additional_comments)
 
-        order_type = dbas.get_order_types(ID)
+        order_type = await dbas.get_order_types(db, ID)
         
         #!-PROGRESS TRACKING --------------------------------------------------------------
         if download_tracker:
@@ -218,18 +246,12 @@ class PDFService:
                 await get_sio_events().progress_update(sid, step_data)
         
         # 5️⃣ Render the PDF
-        output_path = self.output_dir / f"statement_of_need-{ID}.pdf"
-        
-        result = await asyncio.to_thread(
-            self._make_purchase_request_pdf,
+        result = await self.render_pdf_from_rows(
+            ID=ID,
             rows=rows,
-            output_path=output_path,
-            is_cyber=is_cyber,
-            use_comments=False,
             comments=comment_arr,
             order_type=order_type,
             contracting_officer=contracting_officer,
-            download_tracker=download_tracker,
             final_approved=format_username(final_approved) if final_approved else None,
             final_approved_at=final_approved_at,
         )
@@ -258,6 +280,75 @@ class PDFService:
                 await get_sio_events().progress_update(sid, step_data)
         
         return result
+    
+    async def create_pdf(self, ID: str, db: AsyncSession, **kwargs) -> Path:
+        """create_pdf_bytes, saved as output/statement_of_need-{ID}.pdf for callers that need a file (email attachments)."""
+        pdf = await self.create_pdf_bytes(ID, db, **kwargs)
+        return await asyncio.to_thread(self.write_pdf, ID, pdf)
+            
+    async def create_pdf_from_rows(self, ID: str, rows: list[dict], **kwargs) -> Path:
+        """render_pdf_from_rows, saved as output/statement_of_need-{ID}.pdf."""
+        pdf = await self.render_pdf_from_rows(ID, rows, **kwargs)
+        return await asyncio.to_thread(self.write_pdf, ID, pdf)
+    
+    def write_pdf(self, ID: str, pdf: bytes) -> Path:
+        """
+        Temp file + rename: a concurrent reader of the same ID gets the previous or the new
+        document, never a half-written one.
+        """
+        output_path = self.output_dir / f"statement_of_need-{ID}.pdf"
+        write_atomic(output_path, pdf)
+        return output_path
+    
+    async def render_pdf_from_rows(
+        self,
+        ID: str,
+        rows: list[dict],
+        comments: list[str] | None = None,
+        order_type: str | list[str] | None = None,
+        contracting_officer: str | None = None,
+        final_approved: str | None = None,
+        final_approved_at: datetime | None = None,
+    ) -> bytes:
+        """
+        Render the statement of need from rows that are already in memory.
+        The submit pipeline calls this directly with the rows it just inserted,
+        so nothing is read back from the database.
+        order_type is the header's order type, or get_order_types' one-element list.
+        """
+        if not rows:
+            raise HTTPException(status_code=404, detail="No approvals found for this ID")
+        if isinstance(order_type, list):
+            order_type = order_type[0] if order_type else None
+        
+        # Everything the render reads; also the render cache key. Comments are left out:
+        # with use_comments off the statement of need never prints them
+        inputs = dict(
+            rows=printed_rows(rows),
+            is_cyber=any(r.get("isCyberSecRelated") for r in rows),
+            use_comments=False,
+            order_type=order_type,
+            contracting_officer=contracting_officer,
+            final_approved=final_approved,
+            final_approved_at=final_approved_at,
+        )
+        return await self._render_cached(ID, inputs)
+    
+    async def _render_cached(self, ID: str, inputs: dict) -> bytes:
+        """The cached render of these exact inputs, or a fresh render that is then cached."""
+        key = render_cache_key(inputs)
+        pdf = await asyncio.to_thread(self.render_cache.get, key)
+        if pdf is None:
+            pdf, elapsed = await self.render_engine.render(RenderSpec(**inputs))
+            await asyncio.to_thread(self.render_cache.put, key, pdf, elapsed)
+            logger.info(f"PDF cache miss for {ID} ({key[:12]}), rendered in {elapsed:.2f}s")
+        else:
+            stats = self.render_cache.stats()
+            logger.info(
+                f"PDF cache hit for {ID} ({key[:12]}): hit rate {stats['hit_rate']:.0%}, "
+                f"{stats['saved_render_seconds']:.1f}s of rendering saved so far"
+            )
+        return pdf
             
     """
         Generate a purchase request PDF.
@@ -265,20 +356,20 @@ class PDFService:
         Args:
             rows (List[Dict[str, Any]]):  
                 List of dictionaries containing purchase request data.  
-            output_path (Path):  
-                Path where the PDF will be saved.  
+            output (Path | BinaryIO):  
+                File path or in-memory buffer the PDF is written to.  
             is_cyber (bool):  
                 Whether the request is cybersecurity related.
             comments (list[str]):
                 List of comments to be added to the PDF.
 
         Returns:
-            Path:
-                The path to the generated PDF.
+            Path | BinaryIO:
+                output, once the document is written.
         """
     @staticmethod
     def _make_purchase_request_pdf(rows: list[dict], 
-                                   output_path: Path,
+                                   output: Path | BinaryIO,
                                    is_cyber: bool,
                                    use_comments: bool,
                                    comments: list[str]=None, 
@@ -287,13 +378,14 @@ class PDFService:
                                    download_tracker=None,
                                    final_approved: str=None,
                                    final_approved_at: datetime=None,
-                                   ) -> Path: 
+                                   ) -> Path | BinaryIO: 
         logger.info(f"#####################################################")
         logger.info("make_purchase_request_pdf()")
         logger.info(f"#####################################################")
         
         # ensure output folder exists
-        output_path.parent.mkdir(parents=True, exist_ok=True, mode=0o750)
+        if isinstance(output, Path):
+            output.parent.mkdir(parents=True, exist_ok=True, mode=0o750)
         
         # Try to get submit request tracker, but don't fail if it doesn't exist
         submit_request_tracker = None
@@ -303,31 +395,16 @@ class PDFService:
             # Submit request tracker doesn't exist, which is fine for download operations
             pass
         
-        #— fonts & logo setup
-        project_root = Path(__file__).resolve().parent.parent.parent
-        pdfmetrics.registerFont(TTFont("Play", str(project_root / "src/assets/fonts/Play-Regular.ttf")))
-        pdfmetrics.registerFont(TTFont("Play-Bold", str(project_root / "src/assets/fonts/Play-Bold.ttf")))
-
-        logo_path = project_root / "src/assets/seal_no_border.png"
-        img_w, img_h = 0.85 * inch, 0.85 * inch
-        gap = 6  # points of breathing room
-
-        #— styles
-        styles = getSampleStyleSheet()
-        normal = styles["Normal"]
-        normal.fontName = "Play"
-        bold_style = ParagraphStyle(
-            name="BoldStyle",
-            parent=normal,
-            fontName="Play",
-            fontSize=9
-        )
-        header_style = ParagraphStyle("Header", parent=normal, fontSize=9, leading=10, fontName="Play-Bold")
-        cell_style = ParagraphStyle("Cell", parent=normal, fontSize=9, leading=11, fontName="Play")
+        #— fonts, styles & logo (loaded once per process)
+        layout = pdf_layout.get_layout()
+        img_w, img_h = pdf_layout.LOGO_WIDTH, pdf_layout.LOGO_HEIGHT
+        gap = pdf_layout.HEADER_GAP
+        header_style = layout.header_style
+        cell_style = layout.cell_style
 
         #— document setup
         doc = SimpleDocTemplate(
-            str(output_path),
+            str(output) if isinstance(output, Path) else output,
             pagesize=LETTER,
             leftMargin=1*inch, rightMargin=1*inch,
             topMargin=img_h + gap + 1*inch, bottomMargin=1*inch
@@ -349,7 +426,7 @@ class PDFService:
             # logo
             x_logo = 0.2*inch
             y_logo = LETTER[1] - 0.2*inch
-            canvas.drawImage(str(logo_path), x_logo, y_logo - img_h, width=img_w, height=img_h, mask='auto')
+            canvas.drawImage(layout.logo, x_logo, y_logo - img_h, width=img_w, height=img_h, mask='auto')
 
             # ----------------------------------------------------------------------------
             # title
@@ -416,8 +493,7 @@ class PDFService:
         elements.append(Spacer(1, 56))
 
         # line-items table
-        headings = ["BOC","Fund","Location","Description","Qty","Price Each","Total Price","Statement of Need/Justification"]
-        table_data = [[Paragraph(h, header_style) for h in headings]]
+        table_data = [[Paragraph(h, header_style) for h in pdf_layout.LINE_ITEM_HEADINGS]]
         
         # Note: Progress tracking is handled in the main async method, not in this thread-based method
         
@@ -433,21 +509,8 @@ class PDFService:
                 Paragraph(r.get("justification",""), cell_style),
             ])
         
-        line_table = Table(table_data, colWidths=[50,60,60,180,30,50,60,120], repeatRows=1)
-        line_table.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#EEEEEE")),
-            ("FONTNAME", (0,0), (-1,0), "Play-Bold"),
-            ("FONTSIZE", (0,0), (-1,0), 8),
-            ("ALIGN",    (0,0), (-1,0), "CENTER"),
-            ("GRID",     (0,0), (-1,-1), 1, colors.gray),
-            ("FONTSIZE", (0,1), (-1,-1), 9),
-            ("VALIGN",   (0,0), (-1,-1), "TOP"),
-            ("ALIGN",    (4,1), (6,-1), "RIGHT"),
-            ("LEFTPADDING",  (0,0), (-1,-1), 2),
-            ("RIGHTPADDING", (0,0), (-1,-1), 6),
-            ("TOPPADDING",   (0,0), (-1,-1), 6),
-            ("BOTTOMPADDING",(0,0),(-1,-1), 6),
-        ]))
+        line_table = Table(table_data, colWidths=pdf_layout.LINE_ITEM_COL_WIDTHS, repeatRows=1)
+        line_table.setStyle(layout.line_table_style)
         elements.append(line_table)
         elements.append(Spacer(1, 12))
 
@@ -463,10 +526,7 @@ class PDFService:
             cell_style
         )
         
-        legal_10_percent_para = Paragraph(
-            '<font name="Play">*This statement of need approved with a 10% or $100 allowance, whichever is lower, for any additional cost over the estimated amount.</font>',
-            cell_style
-        )
+        legal_10_percent_para = Paragraph(pdf_layout.LEGAL_10_PERCENT_TEXT, cell_style)
         elements.append(cyber_para)
         elements.append(Spacer(1, 6))
         
@@ -484,24 +544,14 @@ class PDFService:
             elements.append(Spacer(1, 6))
 
         # Build TOTAL line
-        total_style = ParagraphStyle(
-            "TotalValue", parent=header_style, alignment=TA_RIGHT
-        )
         total_data = [
-            ["", Paragraph(f"TOTAL: ${total:.2f}", total_style)]
+            ["", Paragraph(f"TOTAL: ${total:.2f}", layout.total_style)]
         ]
         total_table = Table(
             total_data,
             colWidths=[doc.width - 1.5 * inch, 1.5 * inch]
         )
-        total_table.setStyle(TableStyle([
-            ("LINEABOVE",       (0, 0), (-1, 0), 1, colors.gray),
-            ("ALIGN",           (1, 0), (1, 0), "RIGHT"),
-            ("LEFTPADDING",     (0, 0), (-1, -1), 4),
-            ("RIGHTPADDING",    (0, 0), (-1, -1), 4),
-            ("TOPPADDING",      (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING",   (0, 0), (-1, -1), 2),
-        ]))
+        total_table.setStyle(layout.total_table_style)
         elements.append(total_table)
         
         # Build document
@@ -509,5 +559,5 @@ class PDFService:
         
         # Note: Progress tracking is handled in the main async method, not in this thread-based method
         
-        return output_path
+        return output
         
\ No newline at end of file
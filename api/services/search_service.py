@@ -8,45 +8,67 @@ from loguru import logger
 from six import text_type
 import api.services.db_service as dbas
 from api.services.db_service import get_session
-from sqlalchemy import event, select, or_, and_
+from sqlalchemy import event, select, delete, func, text, or_, and_
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm import aliased
 from whoosh.filedb.filestore import RamStorage
 from whoosh.analysis import RegexTokenizer, LowercaseFilter, StopFilter, StemmingAnalyzer
 from whoosh.fields import Schema, ID, TEXT, NUMERIC, BOOLEAN, DATETIME
-from whoosh.index import create_in, open_dir
+from whoosh.index import create_in, exists_in, open_dir
 from whoosh.writing import AsyncWriter
-from whoosh.qparser import MultifieldParser, OrGroup
+from whoosh.qparser import MultifieldParser, OrGroup, FieldAliasPlugin, GtLtPlugin
+from whoosh.qparser.dateparse import DateParserPlugin
+from whoosh.query import And, Every, Term
+from whoosh import sorting
 from api.utils.logging_utils import logger_init_ok
+from api.settings import settings
+import asyncio
+import json
 import os
-from functools import lru_cache
-from typing import Dict, List, Optional, Any
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime
 from .db_service import PurchaseRequestHeader, PurchaseRequestLineItem, Approval, PendingApproval
 
+try:
+    from cachetools import LRUCache
+except ImportError:  # optional, the OrderedDict LRU below is used when it is not installed
+    LRUCache = None
+
 # -----------------------------------------------------------------------------
 # Whoosh schema: define once here, reuse in index creation and searches
+# One document per line item: UUID is the unique key, ID (purchase request) groups them
 approval_schema = Schema(
-    ID            = ID(stored=True, unique=True),
+    ID            = ID(stored=True),
     UUID          = ID(stored=True, unique=True),
     IRQ1_ID       = ID(stored=True),
     CO            = TEXT(stored=True),
     requester     = TEXT(stored=True, analyzer=StemmingAnalyzer()),
-    datereq       = TEXT(stored=True),
+    datereq       = DATETIME(stored=True),
     orderType     = TEXT(stored=True),
     itemDescription = TEXT(stored=True),
     justification = TEXT(stored=True),
     addComments   = TEXT(stored=True),
     trainNotAval  = BOOLEAN(stored=True),
     needsNotMeet  = BOOLEAN(stored=True),
-    budgetObjCode = ID(stored=True),
-    fund          = ID(stored=True),
+    budgetObjCode = ID(stored=True, sortable=True),
+    fund          = ID(stored=True, sortable=True),
     priceEach     = NUMERIC(stored=True, numtype=float),
+    # Not sortable: a float column breaks add_document on Whoosh 2.7.4; sortedby still works from the terms
     totalPrice    = NUMERIC(stored=True, numtype=float),
     location      = TEXT(stored=True),
     quantity      = NUMERIC(stored=True, numtype=int),
     status        = TEXT(stored=True),
-    createdTime   = TEXT(stored=True)
+    createdTime   = DATETIME(stored=True, sortable=True),
+    # Untokenized copies of TEXT fields, for facet counts and exact filters
+    status_facet   = ID(sortable=True),
+    location_facet = ID(sortable=True),
 )
 
 # Fields used for full-text/prefix searching
@@ -56,184 +78,694 @@ searchable_fields = [
     'quantity', 'totalPrice', 'priceEach', 'location', 'status', 'createdTime'
 ]
 
+# Bump whenever approval_schema or the row -> document mapping changes; a mismatch at
+# startup forces a full rebuild instead of a catch-up
+INDEX_SCHEMA_VERSION = 4
+INDEX_META_FILE = "pras_index_meta.json"
+# Each full build gets its own subdirectory of index_dir; the meta file names the current one
+INDEX_BUILD_PREFIX = "build-"
+
+# DB column -> index field where the names differ
+INDEX_FIELD_NAMES = {
+    "purchase_request_id": "ID",
+    "created_time": "createdTime",
+}
+
+def _parse_date_string(value: str) -> Optional[datetime]:
+    # datereq is free text in the DB; unparseable values are left out of the date field
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def _enum_value(value) -> str:
+    return value.value  # Use the enum's value (string)
+
+# Per-field conversion; everything else is indexed as read
+FIELD_CONVERTERS = {
+    "status": _enum_value,
+    "datereq": _parse_date_string,
+}
+
+# Index field -> extra fields that receive the same value
+FIELD_COPIES = {
+    "status": ("status_facet",),
+    "location": ("location_facet",),
+}
+
+def make_document_mapper(keys) -> Callable[[tuple], Dict[str, Any]]:
+    """
+    Precompute (position, field, converter) for the result columns once, so mapping a row
+    is a single pass over a tuple instead of per-key name and type lookups.
+    """
+    schema_names = set(approval_schema.names())
+    plan = []
+    for position, key in enumerate(keys):
+        field = INDEX_FIELD_NAMES.get(key, key)
+        if field not in schema_names:
+            continue
+        for target in (field, *FIELD_COPIES.get(field, ())):
+            plan.append((position, target, FIELD_CONVERTERS.get(field)))
+
+    def to_document(row: tuple) -> Dict[str, Any]:
+        doc = {}
+        for position, field, convert in plan:
+            value = row[position]
+            if value is not None and convert:
+                value = convert(value)
+            if value is not None:
+                doc[field] = value
+        return doc
+
+    return to_document
+
+def _document_rows(session: Session, purchase_request_ids: Optional[List[str]] = None, chunk_size: int = 1000):
+    """
+    One joined query (approval_view + pr_line_items.addComments), streamed off the cursor.
+    Yields (to_document, rows) per chunk.
+    """
+    av = dbas.FlatApproval
+    stmt = (
+        select(*av.__table__.c, PurchaseRequestLineItem.addComments)
+        .join(PurchaseRequestLineItem, PurchaseRequestLineItem.UUID == av.UUID)
+    )
+    if purchase_request_ids is not None:
+        stmt = stmt.where(av.purchase_request_id.in_(purchase_request_ids))
+    result = session.execute(stmt.execution_options(yield_per=chunk_size))
+    to_document = make_document_mapper(result.keys())
+    for rows in result.partitions():
+        yield to_document, rows
+
+TEXT_QUERY_FIELDS    = ('ID','CO','requester','itemDescription','justification','location','status')
+NUMERIC_QUERY_FIELDS = ('budgetObjCode','fund','quantity','priceEach','totalPrice')
+
+# API name -> sortable index field
+SORT_FIELDS = {
+    "totalPrice": "totalPrice",
+    "createdTime": "createdTime",
+}
+
+# API name -> facet/filter index field
+FACET_FIELDS = {
+    "status": "status_facet",
+    "fund": "fund",
+    "budgetObjCode": "budgetObjCode",
+    "location": "location_facet",
+}
+
+# Short names accepted in queries, e.g. "price:>5000 date:2025-03"
+FIELD_ALIASES = {
+    "totalPrice": ["price", "total"],
+    "priceEach": ["each"],
+    "createdTime": ["date", "created"],
+    "datereq": ["needed"],
+    "budgetObjCode": ["boc"],
+}
+
+@lru_cache(maxsize=None)
+def _query_parser(fields: tuple) -> MultifieldParser:
+    """
+    Parsers hold no per-query state, so one per field set is shared by every thread.
+    field:>n / field:<n / field:[a to b] on NUMERIC and DATETIME fields parse to
+    NumericRange / DateRange queries, which match on the indexed terms only.
+    """
+    parser = MultifieldParser(list(fields), schema=approval_schema, group=OrGroup)
+    parser.add_plugin(FieldAliasPlugin(FIELD_ALIASES))
+    parser.add_plugin(GtLtPlugin())
+    parser.add_plugin(DateParserPlugin(free=False))
+    return parser
+
+def _normalize_query(query: str) -> str:
+    """Cache key form of a query; only whitespace is folded, since operators and field names are case-sensitive"""
+    return " ".join(query.split())
+
+_MISSING = object()
+
+class _OrderedDictLRU(OrderedDict):
+    """The part of cachetools.LRUCache the result cache uses; callers hold _cache_lock"""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+if LRUCache is None:
+    LRUCache = _OrderedDictLRU
+
+def _in_offpeak_window(hour: int, start: int, end: int) -> bool:
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+def _hit_to_dict(hit) -> Dict[str, Any]:
+    """Stored fields of a hit; dates go back out as YYYY-MM-DD like before the DATETIME fields"""
+    doc = dict(hit)
+    for field in ("createdTime", "datereq"):
+        if isinstance(doc.get(field), datetime):
+            doc[field] = doc[field].strftime('%Y-%m-%d')
+    return doc
+
 class SearchService:
     """
     Optimized search service for purchase request approvals.
     - RAM storage option
     - Cached schema lookup
-    - Batched, async index updates
+    - Incremental index updates batched per commit (search_index_queue)
     - Prefix + fuzzy search
     """
 
-    def __init__(self, session: Optional[Session] = None, use_ram: bool = False):
-        self.session = session
+    def __init__(self, session_factory=get_session, use_ram: bool = False, index_dir: str = "indexdir"):
+        self.session_factory = session_factory
         self.primary_key = "ID"
-        self._pending_updates: List[Any] = []
-        self.index_dir = "indexdir"
+        self.index_dir = index_dir
+        self.use_ram = use_ram
+        self._build_dir: Optional[str] = None  # index_dir subdirectory holding the current build
 
-        # Initialize Whoosh index
-        if use_ram:
-            self.ix = RamStorage().create_index(approval_schema)
-        else:
-            if not os.path.exists(self.index_dir):
-                os.makedirs(self.index_dir)
-                self.ix = create_in(self.index_dir, schema=approval_schema)
-            else:
-                self.ix = open_dir(self.index_dir)
-                logger_init_ok("Index opened successfully")
+        # Index writes come from the queue drain and rebuilds on worker threads, one at a time
+        self._write_lock = threading.Lock()
+        self._drain_task: Optional[asyncio.Task] = None
+        self._drain_requested = False
+
+        # Queries run on a bounded pool, each worker thread keeps its own searcher
+        self._executor = ThreadPoolExecutor(max_workers=settings.search_threads, thread_name_prefix="search")
+        self._local = threading.local()
 
-        # Build or rebuild the index
-        self.create_whoosh_index()
-        logger_init_ok("Search index initialized and ready")
+        # Results per index generation; a commit moves the generation on and empties the cache
+        self._result_cache = LRUCache(maxsize=settings.search_cache_size) if settings.search_cache_size > 0 else None
+        self._cache_lock = threading.Lock()
+        self._cache_generation = -1
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_invalidations = 0
+
+        # Reuse the on-disk index when it is current enough to catch up, otherwise build it
+        started = time.perf_counter()
+        self.ix = None if use_ram else self._open_persistent_index()
+        if self.ix is None:
+            self.create_whoosh_index()
+        else:
+            self._remove_stale_builds()
+            caught_up = self.process_index_queue()
+            logger_init_ok(f"Index opened, caught up {caught_up} purchase request(s)")
+        logger_init_ok(f"Search index initialized and ready in {time.perf_counter() - started:.2f}s")
 
         # Analyzer for custom parsers
         self.analyzer = RegexTokenizer() | LowercaseFilter() | StopFilter()
 
-        # Listen for ORM events
-        event.listen(Session, "before_commit", self.before_commit)
+        # AsyncSession commits go through the wrapped sync Session, so this sees them too
         event.listen(Session, "after_commit", self.after_commit)
 
+    # ────────────────────────────────────────────────────────────────────────────
+    # PERSISTENCE
+    # ────────────────────────────────────────────────────────────────────────────
+    """
+    The meta file records the index schema version, the build directory in use and the
+    search_index_queue watermark (highest seq already reflected in the index). Queue entries
+    are only deleted after the index commit, so at boot draining the queue is the whole
+    catch-up. A database whose queue sequence is behind the watermark is not the one this
+    index was built from. Replacing the meta file is also how a rebuild swaps in its build.
+    """
+    def _meta_path(self) -> str:
+        return os.path.join(self.index_dir, INDEX_META_FILE)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, watermark: int) -> None:
+        if self.use_ram:
+            return
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"schema_version": INDEX_SCHEMA_VERSION, "dir": self._build_dir, "watermark": watermark}, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def _queue_high_water(self, session: Session) -> int:
+        """Highest seq ever handed out by search_index_queue (AUTOINCREMENT never reuses)"""
+        seq = session.execute(
+            text("SELECT seq FROM sqlite_sequence WHERE name = 'search_index_queue'")
+        ).scalar()
+        return seq or 0
+
+    def _open_persistent_index(self):
+        """Return the on-disk index if it can be caught up incrementally, else None"""
+        meta = self._read_meta()
+        build_path = os.path.join(self.index_dir, meta.get("dir") or "") if meta else None
+        if meta is None or not meta.get("dir") or not exists_in(build_path):
+            logger.info("No persisted search index, building from scratch")
+            return None
+        if meta.get("schema_version") != INDEX_SCHEMA_VERSION:
+            logger.info(f"Search index schema {meta.get('schema_version')} != {INDEX_SCHEMA_VERSION}, rebuilding")
+            return None
+        
+        with self.session_factory() as session:
+            high_water = self._queue_high_water(session)
+        if high_water < meta.get("watermark", 0):
+            logger.warning("Search index is ahead of the database queue (database replaced?), rebuilding")
+            return None
+        
+        try:
+            ix = open_dir(build_path, schema=approval_schema)
+            self._build_dir = meta["dir"]
+            return ix
+        except Exception as e:
+            logger.warning(f"Could not open persisted search index ({e}), rebuilding")
+            return None
+
     def create_whoosh_index(self, db=None):
-        """Create a new Whoosh index for purchase requests and their approvals."""
+        """
+        Create a new Whoosh index with one document per line item. On disk it is built in a
+        new subdirectory while searches keep using the current index, then swapped in by
+        replacing the meta file. The write lock is held throughout, so queue drains wait
+        for the new index instead of writing to the old one.
+        """
         try:
-            # Create the index directory if it doesn't exist
-            if not os.path.exists(self.index_dir):
-                os.makedirs(self.index_dir)
-            
-            # Create the index using the global schema
-            ix = create_in(self.index_dir, approval_schema)
-            
-            # Get all purchase requests and their approvals
-            with get_session() as session:
-                purchase_requests = dbas.get_all_purchase_requests(session)
-                
-                if not purchase_requests:
-                    logger.info("No purchase requests found in database")
-                    return
-                
-                # Create a writer for the index
-                writer = ix.writer()
+            with self._write_lock:
+                build_dir = None
+                # Create the index using the global schema
+                if self.use_ram:
+                    ix = RamStorage().create_index(approval_schema)
+                else:
+                    build_dir = f"{INDEX_BUILD_PREFIX}{uuid.uuid4().hex[:12]}"
+                    build_path = os.path.join(self.index_dir, build_dir)
+                    os.makedirs(build_path)
+                    ix = create_in(build_path, approval_schema)
                 
-                # Index each purchase request and its approval
-                for pr in purchase_requests:
-                    # Get the approval for this purchase request
-                    approval = dbas.get_approval_by_id(session, pr.ID)
-                    if not approval:
-                        continue
+                try:
+                    # Sync session: this runs on a worker thread (startup / rebuild), never on the loop
+                    with self.session_factory() as session:
+                        # Everything queued so far is covered by this build
+                        last_seq = session.scalar(select(func.max(dbas.SearchIndexQueue.seq)))
+                        watermark = self._queue_high_water(session)
                         
-                    # Convert approval to dict and handle enum values
-                    doc = {}
-                    for key, value in approval.__dict__.items():
-                        if key.startswith('_'):
-                            continue
-                        # Handle enum values
-                        if isinstance(value, dbas.ItemStatus):
-                            doc[key] = value.value  # Use the enum's value (string)
-                        elif isinstance(value, datetime):
-                            # Store datetime as string in YYYY-MM-DD format
-                            doc[key] = value.strftime('%Y-%m-%d')
-                        elif isinstance(value, str) and key in ['datereq', 'createdTime']:
-                            # Handle string dates - try to parse and reformat
-                            try:
-                                dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                                doc[key] = dt.strftime('%Y-%m-%d')
-                            except ValueError:
-                                # If parsing fails, use the original string
-                                doc[key] = value
-                        else:
-                            doc[key] = value
-                    
-                    # Set the ID field to the purchase_request_id for search matching
-                    doc['ID'] = approval.purchase_request_id
-                    
-                    
-                    # Filter to only include fields that exist in the schema
-                    filtered_doc = {k: v for k, v in doc.items() if k in approval_schema.names()}
-                    
-                    # Add the document to the index
-                    writer.add_document(**filtered_doc)
-                
-                # Commit the changes
-                writer.commit()
+                        started = time.perf_counter()
+                        writer = self._bulk_writer(ix)
+                        count = 0
+                        try:
+                            for to_document, rows in _document_rows(session, chunk_size=settings.search_rebuild_chunk_size):
+                                for row in rows:
+                                    writer.add_document(**to_document(row))
+                                count += len(rows)
+                        except Exception:
+                            writer.cancel()
+                            raise
+                        writer.commit()
+                        elapsed = time.perf_counter() - started
+                        
+                        # Swap: from here the meta file, and then self.ix, name the new build
+                        self._build_dir = build_dir
+                        self._write_meta(watermark)
+                        self.ix = ix
+                        self._clear_result_cache()
+                        
+                        if last_seq is not None:
+                            session.execute(delete(dbas.SearchIndexQueue).where(dbas.SearchIndexQueue.seq <= last_seq))
+                            session.commit()
+                except Exception:
+                    if build_dir is not None and self._build_dir != build_dir:
+                        shutil.rmtree(os.path.join(self.index_dir, build_dir), ignore_errors=True)
+                    raise
                 
-            logger_init_ok("Search index created successfully")
+                self._remove_stale_builds()
+            logger_init_ok(
+                f"Search index created successfully: {count} documents in {elapsed:.2f}s "
+                f"({count / elapsed if elapsed else 0:,.0f} docs/s)"
+            )
             
         except Exception as e:
             logger.error(f"Error creating search index: {e}")
             raise
 
+    def _remove_stale_builds(self):
+        """
+        Delete every build (and any pre-build-directory index files) except the current one.
+        On Windows a build a searcher still has open cannot be deleted yet; it goes next time.
+        """
+        if self.use_ram or not os.path.isdir(self.index_dir):
+            return
+        for entry in os.scandir(self.index_dir):
+            if entry.name in (self._build_dir, INDEX_META_FILE):
+                continue
+            try:
+                if entry.is_dir():
+                    if entry.name.startswith(INDEX_BUILD_PREFIX):
+                        shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+            except OSError as e:
+                logger.debug(f"Could not remove old search index files {entry.path}: {e}")
+
+    def _bulk_writer(self, ix):
+        """Writer for full builds; procs > 1 uses Whoosh's multiprocessing writer (file storage only)"""
+        if self.use_ram or settings.search_writer_procs <= 1:
+            return ix.writer(limitmb=settings.search_writer_limitmb)
+        return ix.writer(
+            procs=settings.search_writer_procs,
+            limitmb=settings.search_writer_limitmb,
+            multisegment=settings.search_writer_multisegment,
+        )
+
     def rebuild_index(self):
-        """Rebuild the search index from scratch."""
+        """Rebuild the search index from scratch; searches keep using the old index until the swap."""
         try:
-            # Remove existing index directory
-            import shutil
-            if os.path.exists(self.index_dir):
-                shutil.rmtree(self.index_dir)
-            
-            # Recreate the index
             self.create_whoosh_index()
             logger.info("Search index rebuilt successfully")
         except Exception as e:
             logger.error(f"Error rebuilding search index: {e}")
             raise
 
+    # ────────────────────────────────────────────────────────────────────────────
+    # SEARCH
+    # ────────────────────────────────────────────────────────────────────────────
+    def _searcher(self):
+        """
+        This thread's searcher, refreshed only when the index generation moved on
+        (refresh() returns the same searcher otherwise). Reopened after a rebuild swaps self.ix.
+        """
+        local = self._local
+        searcher = getattr(local, "searcher", None)
+        if searcher is None or local.ix is not self.ix:
+            # A rebuild swapped self.ix: this thread's old searcher is idle here, release its files
+            if searcher is not None:
+                searcher.close()
+            local.ix = self.ix
+            searcher = self.ix.searcher()
+        else:
+            searcher = searcher.refresh()
+        
+        local.searcher = searcher
+        return searcher
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # RESULT CACHE
+    # ────────────────────────────────────────────────────────────────────────────
+    def _cached(self, searcher, key: tuple, compute: Callable[[], Any]) -> Any:
+        """
+        compute() through the LRU result cache. Entries belong to one index generation: a
+        searcher on a newer generation empties the cache, and results from a searcher that
+        is behind (or on an index a rebuild just replaced) are returned but not stored.
+        """
+        generation = searcher.reader().generation() if self._result_cache is not None else None
+        if generation is None:  # cache off, or an empty index (EmptyReader is unversioned)
+            return compute()
+        
+        current = self._local.ix is self.ix
+        with self._cache_lock:
+            if current and generation > self._cache_generation:
+                if self._result_cache:
+                    self._cache_invalidations += 1
+                self._result_cache.clear()
+                self._cache_generation = generation
+            cacheable = current and generation == self._cache_generation
+            if cacheable:
+                result = self._result_cache.get(key, _MISSING)
+                if result is not _MISSING:
+                    self._cache_hits += 1
+                    return result
+            self._cache_misses += 1
+        
+        result = compute()
+        if cacheable:
+            with self._cache_lock:
+                if generation == self._cache_generation:
+                    self._result_cache[key] = result
+        return result
+
+    def _clear_result_cache(self):
+        """A rebuilt index starts its generations over, so forget the old ones entirely"""
+        with self._cache_lock:
+            if self._result_cache:
+                self._cache_invalidations += 1
+                self._result_cache.clear()
+            self._cache_generation = -1
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "backend": "whoosh",
+                "enabled": self._result_cache is not None,
+                "size": len(self._result_cache) if self._result_cache is not None else 0,
+                "maxsize": settings.search_cache_size,
+                "generation": self._cache_generation,
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": round(self._cache_hits / lookups, 4) if lookups else None,
+                "invalidations": self._cache_invalidations,
+            }
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # QUERIES
+    # ────────────────────────────────────────────────────────────────────────────
     def execute_search(self, query: str, db: Session = None, limit: int = 10) -> List[Dict]:
         """Perform a prefix-then-fuzzy search across multiple fields."""
+        searcher = self._searcher()
+        query = _normalize_query(query)
+        return self._cached(searcher, ("search", query, limit), partial(self._search, searcher, query, limit))
+
+    def _search(self, searcher, query: str, limit: int) -> List[Dict]:
+        fields_to_search = (NUMERIC_QUERY_FIELDS + TEXT_QUERY_FIELDS) if query.isdigit() else TEXT_QUERY_FIELDS
+        query_obj = _query_parser(fields_to_search).parse(query)
+        results = searcher.search(query_obj, limit=limit)
+        
+        search_results = [_hit_to_dict(hit) for hit in results]
+        logger.info(f"Search results for '{query}': {len(search_results)} items found")
+        if search_results:
+            logger.info(f"First search result: {search_results[0]}")
+        return search_results
+
+    def execute_faceted_search(
+        self,
+        query: str,
+        page: int = 1,
+        pagelen: int = 25,
+        sort: Optional[str] = None,
+        reverse: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of hits plus the total and facet counts over every match, all from a single
+        search pass. An empty query matches everything, so the facets work as a browser.
+        sort is a SORT_FIELDS key (None = relevance); filters maps a FACET_FIELDS key to a value.
+        """
+        searcher = self._searcher()
+        query = _normalize_query(query)
+        filters = {name: value for name, value in (filters or {}).items() if value}
+        key = ("faceted", query, page, pagelen, sort, reverse, tuple(sorted(filters.items())))
+        return self._cached(
+            searcher, key, partial(self._faceted_search, searcher, query, page, pagelen, sort, reverse, filters)
+        )
+
+    def _faceted_search(
+        self,
+        searcher,
+        query: str,
+        page: int,
+        pagelen: int,
+        sort: Optional[str],
+        reverse: bool,
+        filters: Dict[str, str],
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if query:
+            fields_to_search = (NUMERIC_QUERY_FIELDS + TEXT_QUERY_FIELDS) if query.isdigit() else TEXT_QUERY_FIELDS
+            query_obj = _query_parser(fields_to_search).parse(query)
+        else:
+            query_obj = Every()
+        
+        terms = [Term(FACET_FIELDS[name], value) for name, value in filters.items()]
+        facets = {name: sorting.FieldFacet(field, maptype=sorting.Count) for name, field in FACET_FIELDS.items()}
+        
+        results = searcher.search_page(
+            query_obj,
+            page,
+            pagelen=pagelen,
+            sortedby=SORT_FIELDS[sort] if sort else None,
+            reverse=reverse,
+            filter=And(terms) if terms else None,
+            groupedby=facets,
+        )
+        response = {
+            "total": results.total,
+            "page": results.pagenum,
+            "pagelen": pagelen,
+            "pages": results.pagecount,
+            "results": [_hit_to_dict(hit) for hit in results],
+            "facets": {
+                name: dict(sorted(results.results.groups(name).items(), key=lambda kv: -kv[1]))
+                for name in FACET_FIELDS
+            },
+        }
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > settings.search_latency_target_ms:
+            logger.warning(
+                f"Faceted search over latency target: {elapsed_ms:.0f}ms > {settings.search_latency_target_ms}ms "
+                f"(query='{query}', total={results.total}, page={page}, sort={sort})"
+            )
+        return response
+
+    async def faceted_search(self, query: str, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.execute_faceted_search, query, **kwargs))
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """execute_search on the search thread pool, so a slow query never blocks the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.execute_search, query, None, limit)
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # MAINTENANCE
+    # ────────────────────────────────────────────────────────────────────────────
+    """
+    Every queue drain commits a new segment, and Whoosh only folds small ones together
+    as it goes, so segments and deleted documents accumulate. Merging takes the write
+    lock (queue drains wait, they never fail) but not readers: searchers keep the old
+    segments until their next refresh().
+    """
+    def _segment_stats(self) -> Dict[str, Any]:
+        with self.ix.reader() as reader:
+            segments = len(reader.leaf_readers())
+            docs, all_docs = reader.doc_count(), reader.doc_count_all()
+        return {
+            "segments": segments,
+            "docs": docs,
+            "deleted": all_docs - docs,
+            "mb": self.ix.storage.total_size() / (1024 * 1024),
+        }
+
+    def _probe_latency_ms(self, rounds: int = 3) -> float:
+        """Best of a few uncached match-everything faceted searches, on a fresh searcher"""
+        best = float("inf")
         with self.ix.searcher() as searcher:
-            text_fields    = ['ID','CO','requester','itemDescription','justification','location','status']
-            numeric_fields = ['budgetObjCode','fund','quantity','priceEach','totalPrice']
-            
-            if query.isdigit():
-                fields_to_search = numeric_fields + text_fields
-            else:
-                fields_to_search = text_fields
-                
-            parser = MultifieldParser(fields_to_search, schema=self.ix.schema, group=OrGroup)
-            
-            query_obj = parser.parse(query)
-            results = searcher.search(query_obj, limit=limit)
-            
-            search_results = [dict(hit) for hit in results]
-            logger.info(f"Search results for '{query}': {len(search_results)} items found")
-            if search_results:
-                logger.info(f"First search result: {search_results[0]}")
-            return search_results
-
-    def before_commit(self, session):
-        """Cache pending ORM changes."""
-        self._pending_updates = [ ("deleted" if m in session.deleted else
-                                    "new" if m in session.new else
-                                    "updated", m)
-                                  for m in session.new | session.dirty | session.deleted
-                                  if hasattr(m.__class__, '__searchable__') ]
+            for _ in range(rounds):
+                started = time.perf_counter()
+                self._faceted_search(searcher, "", 1, 25, None, False, {})
+                best = min(best, (time.perf_counter() - started) * 1000)
+        return best
+
+    def maintain_index(self, force: bool = False) -> Optional[str]:
+        """
+        Merge small segments once there are more than search_merge_segment_threshold, or
+        optimize into one when search_optimize_deleted_ratio of the documents are deleted.
+        Outside the off-peak window nothing runs unless force. Returns the action taken.
+        """
+        if not force and not _in_offpeak_window(
+            datetime.now().hour, settings.search_offpeak_start_hour, settings.search_offpeak_end_hour
+        ):
+            return None
+        
+        before = self._segment_stats()
+        deleted_ratio = before["deleted"] / max(before["docs"] + before["deleted"], 1)
+        if deleted_ratio >= settings.search_optimize_deleted_ratio:
+            action = "optimize"
+        elif before["segments"] > settings.search_merge_segment_threshold:
+            action = "merge"
+        else:
+            logger.debug(f"Search index maintenance skipped: {before['segments']} segment(s), {deleted_ratio:.0%} deleted")
+            return None
+        
+        latency_before = self._probe_latency_ms()
+        started = time.perf_counter()
+        with self._write_lock:
+            writer = self.ix.writer()
+            writer.commit(merge=True, optimize=(action == "optimize"))
+        elapsed = time.perf_counter() - started
+        after = self._segment_stats()
+        latency_after = self._probe_latency_ms()
+        
+        logger.info(
+            f"Search index {action} in {elapsed:.2f}s: segments {before['segments']} -> {after['segments']}, "
+            f"deleted docs {before['deleted']} -> {after['deleted']}, size {before['mb']:.1f} -> {after['mb']:.1f} MB, "
+            f"probe latency {latency_before:.1f} -> {latency_after:.1f} ms"
+        )
+        return action
 
+    async def start_index_maintenance(self, interval_sec: int):
+        """Check the index for merge work in a background task"""
+        logger_init_ok(
+            f"Starting search index maintenance with {interval_sec}s interval "
+            f"(off-peak {settings.search_offpeak_start_hour}:00-{settings.search_offpeak_end_hour}:00)"
+        )
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                await asyncio.to_thread(self.maintain_index)
+            except Exception as e:
+                logger.error(f"Error maintaining search index: {e}")
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # INCREMENTAL UPDATES
+    # ────────────────────────────────────────────────────────────────────────────
     def after_commit(self, session):
-        """Apply batched changes to the index."""
-        if not self._pending_updates:
-            return
-        writer = AsyncWriter(self.ix)
+        """Schedule a drain of search_index_queue; commits made off the loop are picked up by the next one."""
         try:
-            for change, model in self._pending_updates:
-                key = getattr(model, self.primary_key)
-                if change == 'deleted':
-                    writer.delete_by_term(self.primary_key, text_type(key))
-                else:
-                    # Build attrs dict
-                    attrs = {}
-                    for f in model.__class__.__searchable__:
-                        if f not in self.ix.schema.names():
-                            continue  # Skip fields not in schema
-                        v = getattr(model, f, None)
-                        if isinstance(v, dbas.ItemStatus):
-                            attrs[f] = v.value
-                        elif isinstance(v, datetime):
-                            attrs[f] = v.strftime('%Y-%m-%d')
-                        else:
-                            attrs[f] = v
-                    attrs[self.primary_key] = text_type(key)
-                    writer.update_document(**attrs)
-            writer.commit()
-        except Exception as e:
-            writer.cancel()
-            logger.error(f"Error in after_commit: {e}")
-            raise
\ No newline at end of file
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._drain_requested = True
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = loop.create_task(self._drain_loop())
+
+    async def _drain_loop(self):
+        # Commits landing while a drain runs set the flag again and get one more pass
+        while self._drain_requested:
+            self._drain_requested = False
+            try:
+                await asyncio.to_thread(self.process_index_queue)
+            except Exception as e:
+                logger.error(f"Error draining search index queue: {e}")
+
+    async def flush(self):
+        """Wait until every change committed so far is searchable."""
+        self._drain_requested = True
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain_loop())
+        await self._drain_task
+
+    def process_index_queue(self) -> int:
+        """
+        Reindex every purchase request in search_index_queue in one writer commit, then
+        remove the processed entries. Returns the number of purchase requests reindexed.
+        """
+        with self._write_lock, self.session_factory() as session:
+            queued = session.execute(
+                select(dbas.SearchIndexQueue.seq, dbas.SearchIndexQueue.purchase_request_id)
+            ).all()
+            if not queued:
+                return 0
+            last_seq = max(seq for seq, _ in queued)
+            pr_ids = sorted({pr_id for _, pr_id in queued})
+            
+            writer = self.ix.writer()
+            try:
+                for pr_id in pr_ids:
+                    writer.delete_by_term(self.primary_key, text_type(pr_id))
+                for to_document, rows in _document_rows(session, pr_ids):
+                    for row in rows:
+                        writer.add_document(**to_document(row))
+                writer.commit()
+            except Exception:
+                writer.cancel()
+                raise
+            
+            self._write_meta(last_seq)
+            session.execute(delete(dbas.SearchIndexQueue).where(dbas.SearchIndexQueue.seq <= last_seq))
+            session.commit()
+        
+        logger.debug(f"Reindexed {len(pr_ids)} purchase request(s) from {len(queued)} queued change(s)")
+        return len(pr_ids)
@@ -0,0 +1,100 @@
+######################################################################################
+# Name: STATEMENT OF NEED EXPORT
+# Description: Many statements of need as one ZIP, streamed while it is produced
+#
+# Each purchase request renders (or comes from the render cache) on its own AsyncSession,
+# at most `concurrency` at a time. Entries are appended in completion order and the bytes
+# zipfile wrote for them are handed to the response right away, so only the PDFs in
+# flight are ever held in memory. Requests that fail are listed in export_errors.txt
+# at the end of the archive; headers are long gone by then, so they cannot become a 500.
+
+from loguru import logger
+from api.services.db_service import AsyncSessionLocal
+from typing import AsyncIterator, List, Optional
+import asyncio
+import io
+import zipfile
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable target for ZipFile; collects what it writes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def stream_statements_of_need_zip(
+    pdf_service,
+    ids: List[str],
+    *,
+    concurrency: int,
+    sid: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP of statement_of_need-{ID}.pdf for every ID, reporting progress to sid."""
+    from api.services.socketio_server import sio_events
+
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps the loop's per-entry work to a CRC
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    # A render keeps its slot until the loop below takes its PDF off the queue, so at most
+    # `concurrency` PDFs are rendering or waiting and a slow client slows rendering down
+    slots = asyncio.Semaphore(concurrency)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def render(ID: str):
+        await slots.acquire()
+        try:
+            async with AsyncSessionLocal() as session:
+                pdf = await pdf_service.create_pdf_bytes(ID, session, track_progress=False)
+            result = (ID, pdf, None)
+        except asyncio.CancelledError:
+            slots.release()
+            raise
+        except Exception as e:
+            result = (ID, None, e)
+        finished.put_nowait(result)
+
+    if sid:
+        await sio_events.start_toast(sid, 0)
+    tasks = [asyncio.create_task(render(ID)) for ID in ids]
+    failed: List[str] = []
+    try:
+        for done in range(1, len(ids) + 1):
+            ID, pdf, error = await finished.get()
+            slots.release()
+            if error is None:
+                archive.writestr(f"statement_of_need-{ID}.pdf", pdf)
+            else:
+                logger.error(f"Statement of need export: {ID} failed: {error}")
+                failed.append(f"{ID}: {error}")
+
+            if sid:
+                await sio_events.progress_update(sid, {
+                    "event": "PROGRESS_UPDATE",
+                    "percent_complete": round(done * 100 / len(ids)),
+                    "export": {"done": done, "total": len(ids), "failed": len(failed), "ID": ID},
+                })
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        if failed:
+            archive.writestr("export_errors.txt", "\n".join(failed) + "\n")
+        archive.close()
+        yield sink.drain()
+        logger.info(f"Statement of need export finished: {len(ids) - len(failed)} PDF(s), {len(failed)} failed")
+    finally:
+        # Client went away (or we are done): stop whatever is still waiting to render
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
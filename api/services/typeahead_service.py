@@ -0,0 +1,155 @@
+######################################################################################
+# Name: TYPEAHEAD SERVICE
+# Description: In-memory prefix indexes for keystroke lookups
+#
+# Each field keeps a sorted array of lowercased keys; a prefix query is one bisect
+# plus a short forward scan, so answers never touch the database or LDAP.
+#   - requester / itemDescription / location: built from approval_view, then topped up
+#     with rows created since the last refresh
+#   - username: a periodic snapshot of the LDAP directory
+# Every directory refresh also rebuilds the DB fields, which picks up edited values.
+
+from loguru import logger
+from api.services.db_service import AsyncSessionLocal, FlatApproval
+from api.utils.logging_utils import logger_init_ok
+from sqlalchemy import func, select
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import time
+
+# Index name -> approval_view column it is built from
+DB_FIELDS = {
+    "requester": FlatApproval.requester,
+    "itemDescription": FlatApproval.itemDescription,
+    "location": FlatApproval.location,
+}
+DIRECTORY_FIELD = "username"
+TYPEAHEAD_FIELDS = (*DB_FIELDS, DIRECTORY_FIELD)
+
+class PrefixIndex:
+    """Case-insensitive prefix lookup over a sorted array of distinct values."""
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, values: Iterable[str] = ()):
+        # First spelling wins when values differ only by case
+        distinct: Dict[str, str] = {}
+        for value in values:
+            if value:
+                distinct.setdefault(value.lower(), value)
+        self._keys = sorted(distinct)
+        self._values = [distinct[key] for key in self._keys]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, value: str):
+        if not value:
+            return
+        key = value.lower()
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self._values.insert(i, value)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        key = prefix.lower()
+        i = bisect_left(self._keys, key)
+        matches = []
+        while i < len(self._keys) and len(matches) < limit and self._keys[i].startswith(key):
+            matches.append(self._values[i])
+            i += 1
+        return matches
+
+class TypeaheadService:
+    """
+    Prefix indexes for the typeahead endpoints.
+    - Full builds happen off the event loop and are swapped in whole
+    - Incremental top-ups and lookups run on the loop
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, PrefixIndex] = {name: PrefixIndex() for name in TYPEAHEAD_FIELDS}
+        self._watermark: Optional[datetime] = None
+        self.directory_loaded = False
+
+    def complete(self, field: str, prefix: str, limit: int = 10) -> List[str]:
+        return self.indexes[field].complete(prefix, limit)
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # DATABASE FIELDS
+    # ────────────────────────────────────────────────────────────────────────────
+    async def _distinct_values(self, session, since: Optional[datetime]) -> tuple[Dict[str, List[str]], Optional[datetime]]:
+        values = {}
+        for name, column in DB_FIELDS.items():
+            stmt = select(column).distinct()
+            if since is not None:
+                # >= so rows sharing the watermark's timestamp are not missed; duplicates are ignored
+                stmt = stmt.where(FlatApproval.created_time >= since)
+            values[name] = list((await session.scalars(stmt)).all())
+        watermark = await session.scalar(select(func.max(FlatApproval.created_time)))
+        return values, watermark
+
+    async def rebuild_db_indexes(self):
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            values, watermark = await self._distinct_values(session, None)
+        for name, column_values in values.items():
+            self.indexes[name] = await asyncio.to_thread(PrefixIndex, column_values)
+        self._watermark = watermark
+        sizes = ", ".join(f"{name}={len(self.indexes[name])}" for name in DB_FIELDS)
+        logger.info(f"Typeahead DB indexes rebuilt in {time.perf_counter() - started:.2f}s ({sizes})")
+
+    async def refresh_db_indexes(self):
+        """Add values from approval_view rows created since the last refresh."""
+        if self._watermark is None:
+            await self.rebuild_db_indexes()
+            return
+        async with AsyncSessionLocal() as session:
+            values, watermark = await self._distinct_values(session, self._watermark)
+        for name, column_values in values.items():
+            index = self.indexes[name]
+            for value in column_values:
+                index.add(value)
+        if watermark is not None:
+            self._watermark = watermark
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # DIRECTORY SNAPSHOT
+    # ────────────────────────────────────────────────────────────────────────────
+    async def refresh_directory(self, ldap_service):
+        usernames = await ldap_service.fetch_directory_usernames()
+        self.indexes[DIRECTORY_FIELD] = await asyncio.to_thread(PrefixIndex, usernames)
+        self.directory_loaded = True
+        logger.info(f"Typeahead directory snapshot loaded ({len(usernames)} usernames)")
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # BACKGROUND REFRESH
+    # ────────────────────────────────────────────────────────────────────────────
+    async def start_refresh(self, ldap_service, interval_sec: int, directory_interval_sec: int):
+        """Keep the indexes current in a background task"""
+        logger_init_ok(
+            f"Starting typeahead refresh with {interval_sec}s interval "
+            f"(directory every {directory_interval_sec}s)"
+        )
+        next_full = 0.0
+        while True:
+            full = time.monotonic() >= next_full
+            try:
+                if full:
+                    await self.rebuild_db_indexes()
+                else:
+                    await self.refresh_db_indexes()
+            except Exception as e:
+                logger.error(f"Error refreshing typeahead indexes: {e}")
+            if full:
+                try:
+                    await self.refresh_directory(ldap_service)
+                    next_full = time.monotonic() + directory_interval_sec
+                except Exception as e:
+                    # Retried next interval; lookups keep the previous snapshot meanwhile
+                    logger.error(f"Error loading typeahead directory snapshot: {e}")
+            await asyncio.sleep(interval_sec)
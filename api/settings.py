@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     DATABASE_FILE_PATH: Path = BASE_DIR / "api" / "db" / "pras.db"
     SQL_SCRIPT_PATH: Path = BASE_DIR / "api" / "db" / "pras_sql_script.sql"
+    MIGRATIONS_DIR: Path = BASE_DIR / "api" / "db" / "migrations"
     PDF_OUTPUT_FOLDER: Path = BASE_DIR / "api" / "pdf_output"
     UPLOAD_FOLDER: Path = BASE_DIR / "api" / "uploads"
 
@@ -43,6 +44,56 @@ class Settings(BaseSettings):
     smtp_email_addr: str
     smtp_tls: bool = False
     
+    # -- SQLite tuning ("production" or "default", see SQLITE_PRAGMA_PROFILES in db_service)
+    sqlite_pragma_profile: str = "production"
+    sqlite_pragma_overrides: dict[str, str | int] = {}   # e.g. {"mmap_size": 0}
+    
+    # -- Draft purchase request IDs
+    draft_ttl_hours: int = 24                 # IN_PROGRESS drafts older than this are reclaimed
+    draft_reclaim_interval_sec: int = 3600    # How often the reclaimer runs
+    
+    # -- /getApprovalData paging
+    approval_page_size: int = 500             # Rows per page when the client sends a cursor but no limit
+    approval_page_size_max: int = 5000
+    approval_stream_chunk_size: int = 1000    # Rows fetched per round trip by /getApprovalData/stream
+    
+    # -- Sync engine use on the event loop thread: "off", "warn" or "raise" (use "raise" in tests)
+    sync_db_on_loop: str = "warn"
+    
+    # -- Search backend: "whoosh" (indexdir) or "fts5" (approval_fts table in pras.db)
+    search_backend: str = "whoosh"
+    
+    # -- Search index full rebuilds
+    search_rebuild_chunk_size: int = 2000     # Rows streamed per fetch
+    search_writer_procs: int = 1              # > 1 builds segments in parallel processes
+    search_writer_limitmb: int = 256          # Memory per writer process for buffering postings
+    search_writer_multisegment: bool = True   # With procs > 1, keep each process's segment instead of merging
+    search_threads: int = 4                   # Worker threads for queries, each with its own searcher
+    search_latency_target_ms: int = 250       # Faceted searches slower than this are logged
+    search_cache_size: int = 256              # LRU result cache entries per index generation (0 = off)
+    search_maintenance_interval_sec: int = 900     # How often segment counts are checked
+    search_merge_segment_threshold: int = 8        # Merge small segments above this many segments
+    search_optimize_deleted_ratio: float = 0.2     # Rewrite into one segment above this share of deleted docs
+    search_offpeak_start_hour: int = 19            # Merges only run from this hour (local time) ...
+    search_offpeak_end_hour: int = 6               # ... until this one; start > end wraps past midnight
+    
+    # -- Typeahead prefix indexes
+    typeahead_refresh_interval_sec: int = 60           # New approval_view values are added this often
+    typeahead_directory_refresh_sec: int = 3600        # Full rebuild incl. the LDAP username snapshot
+    
+    # -- Statement of need render cache (PDF_OUTPUT_FOLDER / "son_cache")
+    pdf_cache_max_mb: int = 512                    # Least recently used renders are evicted above this
+    
+    # -- Statement of need render engine
+    pdf_render_workers: int = 2                    # Worker processes (0 = render on a thread)
+    pdf_render_max_pending: int = 8                # Renders queued or running at once
+    pdf_render_queue_wait_sec: float = 10.0        # Wait this long for a slot, then 503
+    pdf_render_timeout_sec: float = 60.0           # Per-render limit, then 504 and a fresh pool
+    
+    # -- Bulk statement of need export
+    son_export_concurrency: int = 2                # Renders in flight per export (leave room for downloads)
+    son_export_max_requests: int = 2000            # Larger selections are refused; narrow the filter
+    
     
     def model_post_init(self, __context):
         # Ensure required directories exist
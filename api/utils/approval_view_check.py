@@ -0,0 +1,92 @@
+import argparse
+import sqlite3
+import sys
+
+"""
+Offline consistency check for the trigger-maintained approval_view table
+(see api/db/migrations/0003_approval_view.sql).
+
+Compares approval_view against a fresh join of pr_line_items and purchase_request_headers
+and reports rows that are missing, stale or orphaned. With --rebuild the table is
+repopulated from the join in a single transaction and checked again.
+
+Only needs the standard library, so it can run against a copy of the database:
+    python -m api.utils.approval_view_check --db api/db/pras.db [--rebuild]
+
+Exit code is 0 when the view is consistent, 1 otherwise.
+"""
+
+EXPECTED_SQL = """
+SELECT li.UUID, hdr.ID, hdr.IRQ1_ID, hdr.requester, hdr.CO, hdr.datereq, hdr.orderType,
+       li.itemDescription, li.justification, li.trainNotAval, li.needsNotMeet,
+       li.budgetObjCode, li.fund, li.priceEach, li.totalPrice, li.location, li.quantity,
+       li.created_time, li.isCyberSecRelated, li.status
+FROM pr_line_items li
+JOIN purchase_request_headers hdr ON hdr.ID = li.purchase_request_id
+"""
+
+VIEW_SQL = """
+SELECT UUID, purchase_request_id, IRQ1_ID, requester, CO, datereq, orderType,
+       itemDescription, justification, trainNotAval, needsNotMeet,
+       budgetObjCode, fund, priceEach, totalPrice, location, quantity,
+       created_time, isCyberSecRelated, status
+FROM approval_view
+"""
+
+#--------------------------------------------------------------------------------------------------
+# CHECK
+#--------------------------------------------------------------------------------------------------
+def check(conn: sqlite3.Connection, sample: int = 10) -> bool:
+    # Rows the join produces that the view lacks or holds with different values
+    missing = [r[0] for r in conn.execute(f"SELECT UUID FROM ({EXPECTED_SQL} EXCEPT {VIEW_SQL})")]
+    # Rows in the view that are out of date or whose line item no longer exists
+    extra = [r[0] for r in conn.execute(f"SELECT UUID FROM ({VIEW_SQL} EXCEPT {EXPECTED_SQL})")]
+
+    stale = set(missing) & set(extra)
+    only_missing = [u for u in missing if u not in stale]
+    orphaned = [u for u in extra if u not in stale]
+    total = conn.execute("SELECT count(*) FROM approval_view").fetchone()[0]
+
+    print(f"approval_view rows: {total}")
+    for label, uuids in (("missing", only_missing), ("stale", sorted(stale)), ("orphaned", orphaned)):
+        print(f"  {label:<9}{len(uuids)}")
+        for u in uuids[:sample]:
+            print(f"    {u}")
+
+    return not (missing or extra)
+
+#--------------------------------------------------------------------------------------------------
+# REBUILD
+#--------------------------------------------------------------------------------------------------
+def rebuild(conn: sqlite3.Connection) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM approval_view")
+        count = conn.execute(f"INSERT INTO approval_view {EXPECTED_SQL}").rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the approval_view table")
+    parser.add_argument("--db", default="api/db/pras.db", help="path to the SQLite database")
+    parser.add_argument("--rebuild", action="store_true", help="repopulate approval_view from the base tables")
+    parser.add_argument("--sample", type=int, default=10, help="UUIDs listed per category")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    try:
+        if args.rebuild:
+            print(f"Rebuilt approval_view with {rebuild(conn)} rows")
+        ok = check(conn, args.sample)
+    finally:
+        conn.close()
+
+    print("OK" if ok else "INCONSISTENT")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
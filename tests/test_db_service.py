@@ -0,0 +1,340 @@
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, delete, event, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import uuid
+import api.services.db_service as dbas
+from api.schemas.enums import ItemStatus
+from api.utils import approval_view_check
+from tests.test_send_purchase_request import pras_api, submit
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "api" / "db" / "migrations"
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Throwaway database with the ORM tables plus the migration indexes and triggers"""
+    path = tmp_path / "pras.db"
+    engine = create_engine(f"sqlite:///{path}")
+    dbas.Base.metadata.create_all(engine)
+    engine.dispose()
+    with sqlite3.connect(path) as conn:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            conn.executescript(migration.read_text(encoding="utf-8"))
+    return path
+
+@pytest.fixture
+def sync_session(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+@pytest_asyncio.fixture
+async def async_session_factory(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    event.listen(engine.sync_engine, "connect", dbas.apply_sqlite_pragmas)
+    yield sessionmaker(bind=engine, class_=AsyncSession)
+    await engine.dispose()
+
+def add_request(session, ID: str, items: int = 1, created: datetime = datetime(2025, 6, 5, 9, 0, 0)):
+    session.add(dbas.PurchaseRequestHeader(
+        ID=ID, requester="roman", datereq="2025-06-05", orderType="QUARTERLY_ORDER", submission_status="SUBMITTED",
+    ))
+    for n in range(items):
+        session.add(dbas.PurchaseRequestLineItem(
+            UUID=f"{ID}-{n}", purchase_request_id=ID, itemDescription=f"Item {n}", justification="Replacement",
+            budgetObjCode="6100", fund="51140X", quantity=1, priceEach=10.0, originalPriceEach=10.0,
+            totalPrice=10.0, location="LKCH/C", created_time=created + timedelta(minutes=n),
+        ))
+
+@pytest.mark.asyncio
+async def test_approval_page_without_limit_returns_everything_newest_first(sync_session, async_session_factory):
+    add_request(sync_session, "LAWB0001", items=2, created=datetime(2025, 6, 1))
+    add_request(sync_session, "LAWB0002", items=2, created=datetime(2025, 6, 2))
+    sync_session.commit()
+
+    async with async_session_factory() as db:
+        rows, next_cursor = await dbas.fetch_approval_page(db, limit=None)
+    assert [r["UUID"] for r in rows] == ["LAWB0002-1", "LAWB0002-0", "LAWB0001-1", "LAWB0001-0"]
+    assert next_cursor is None
+
+@pytest.mark.asyncio
+async def test_approval_pages_follow_the_cursor_newest_first(sync_session, async_session_factory):
+    add_request(sync_session, "LAWB0003", items=5)
+    sync_session.commit()
+
+    seen, cursor = [], None
+    async with async_session_factory() as db:
+        while True:
+            rows, cursor = await dbas.fetch_approval_page(db, limit=2, cursor=cursor)
+            seen.append([r["UUID"] for r in rows])
+            if cursor is None:
+                break
+    assert seen == [["LAWB0003-4", "LAWB0003-3"], ["LAWB0003-2", "LAWB0003-1"], ["LAWB0003-0"]]
+
+async def create_new_id(session_factory, requester: str) -> str:
+    """What /createNewID does with its request session"""
+    async with session_factory() as db:
+        async with db.begin():
+            return await dbas.reserve_draft_id(db, requester)
+
+@pytest.mark.asyncio
+async def test_concurrent_create_new_id_gives_each_requester_one_draft(async_session_factory):
+    requesters = [f"user{n}" for n in range(8)]
+    ids = await asyncio.gather(*(create_new_id(async_session_factory, r) for r in requesters))
+    assert len(set(ids)) == len(requesters)
+
+    # Parallel first calls from one requester share a draft instead of inserting two
+    same = await asyncio.gather(*(create_new_id(async_session_factory, "roman") for _ in range(8)))
+    assert len(set(same)) == 1
+    async with async_session_factory() as db:
+        drafts = await db.scalar(
+            select(func.count()).select_from(dbas.PurchaseRequestHeader)
+            .where(dbas.PurchaseRequestHeader.requester == "roman",
+                   dbas.PurchaseRequestHeader.submission_status == "IN_PROGRESS")
+        )
+    assert drafts == 1
+
+@pytest.mark.asyncio
+async def test_keep_alive_leaves_created_time_and_drives_the_reclaimer(async_session_factory):
+    draft_id = await create_new_id(async_session_factory, "roman")
+    long_ago = datetime(2020, 1, 1)
+    async with async_session_factory() as db:
+        await db.execute(
+            update(dbas.PurchaseRequestHeader)
+            .where(dbas.PurchaseRequestHeader.ID == draft_id)
+            .values(created_time=long_ago, touched_time=long_ago)
+        )
+        await db.commit()
+
+    # A stale keep-alive is refreshed; the creation time stays as it was
+    assert await create_new_id(async_session_factory, "roman") == draft_id
+    async with async_session_factory() as db:
+        header = await db.scalar(select(dbas.PurchaseRequestHeader).where(dbas.PurchaseRequestHeader.ID == draft_id))
+        assert header.created_time == long_ago
+        assert header.touched_time > long_ago
+        assert await dbas.reclaim_abandoned_drafts(db, ttl_hours=24) == 0
+
+        await db.execute(
+            update(dbas.PurchaseRequestHeader)
+            .where(dbas.PurchaseRequestHeader.ID == draft_id)
+            .values(touched_time=long_ago)
+        )
+        await db.commit()
+        assert await dbas.reclaim_abandoned_drafts(db, ttl_hours=24) == 1
+
+# Hot lookups from db_service and the approval handlers, with the index each one must use
+HOT_QUERIES = [
+    ("SELECT status, assigned_group FROM pending_approvals WHERE line_item_uuid = ? AND purchase_request_id = ?",
+     "ix_pending_approvals_line_item"),
+    ("SELECT count(*) FROM pending_approvals WHERE purchase_request_id = ?", "ix_pending_approvals_purchase_request"),
+    ("SELECT CO FROM approvals WHERE purchase_request_id = ?", "ix_approvals_purchase_request"),
+    ("SELECT comment_text FROM son_comments WHERE line_item_uuid = ?", "ix_son_comments_line_item"),
+    ("SELECT status FROM final_approvals WHERE line_item_uuid = ?", "ix_final_approvals_line_item"),
+    ("SELECT UUID FROM pr_line_items WHERE purchase_request_id = ?", "ix_pr_line_items_purchase_request"),
+    ("SELECT username, email FROM workflow_users WHERE department = ? AND active = 1", "ix_workflow_users_department"),
+    ("SELECT ID FROM purchase_request_headers WHERE requester = ? AND submission_status = 'IN_PROGRESS'",
+     "ux_purchase_request_headers_draft"),
+]
+
+@pytest.mark.parametrize("sql, index", HOT_QUERIES)
+def test_hot_queries_search_their_index(db_path, sql, index):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("ANALYZE")
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * sql.count("?"))]
+    assert not [step for step in plan if step.startswith("SCAN")], plan
+    assert any(index in step for step in plan), plan
+
+def test_migrations_record_the_schema_version_and_rerun_as_no_ops(tmp_path, monkeypatch):
+    path = tmp_path / "fresh.db"
+    engine = create_engine(f"sqlite:///{path}")
+    dbas.Base.metadata.create_all(engine)
+    engine.dispose()
+    monkeypatch.setattr(dbas.settings, "DATABASE_FILE_PATH", path)
+
+    latest = max(int(p.name.split("_", 1)[0]) for p in MIGRATIONS_DIR.glob("*.sql"))
+    assert dbas.run_migrations() == latest
+    assert dbas.run_migrations() == latest
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == latest
+
+def test_approval_view_triggers_follow_every_write(db_path, sync_session):
+    def consistent() -> bool:
+        with sqlite3.connect(db_path) as conn:
+            return approval_view_check.check(conn)
+
+    add_request(sync_session, "LAWB0004", items=2)
+    add_request(sync_session, "LAWB0005")
+    sync_session.commit()
+    assert consistent()
+
+    writes = [
+        update(dbas.PurchaseRequestLineItem).where(dbas.PurchaseRequestLineItem.UUID == "LAWB0004-0")
+            .values(status=ItemStatus.APPROVED, priceEach=12.5, totalPrice=12.5),
+        update(dbas.PurchaseRequestHeader).where(dbas.PurchaseRequestHeader.ID == "LAWB0004")
+            .values(CO="CO Name", IRQ1_ID="IRQ1-0004", orderType="SPECIAL_ORDER"),
+        delete(dbas.PurchaseRequestLineItem).where(dbas.PurchaseRequestLineItem.UUID == "LAWB0004-1"),
+        delete(dbas.PurchaseRequestLineItem).where(dbas.PurchaseRequestLineItem.purchase_request_id == "LAWB0005"),
+        delete(dbas.PurchaseRequestHeader).where(dbas.PurchaseRequestHeader.ID == "LAWB0005"),
+    ]
+    for write in writes:
+        sync_session.execute(write)
+        sync_session.commit()
+        assert consistent(), str(write)
+
+    with sqlite3.connect(db_path) as conn:
+        assert [r[0] for r in conn.execute("SELECT UUID FROM approval_view")] == ["LAWB0004-0"]
+
+def test_approval_view_check_finds_drift_and_rebuild_repairs_it(db_path, sync_session):
+    add_request(sync_session, "LAWB0006", items=2)
+    sync_session.commit()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("UPDATE approval_view SET totalPrice = 0 WHERE UUID = 'LAWB0006-0'")
+        conn.execute("DELETE FROM approval_view WHERE UUID = 'LAWB0006-1'")
+        assert not approval_view_check.check(conn)
+
+        assert approval_view_check.rebuild(conn) == 2
+        assert approval_view_check.check(conn)
+    finally:
+        conn.close()
+
+@pytest.mark.asyncio
+async def test_sync_query_on_the_loop_raises_when_guarded(db_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "before_cursor_execute", dbas._guard_sync_query_on_loop)
+    monkeypatch.setattr(dbas.settings, "sync_db_on_loop", "raise")
+
+    def count_headers():
+        with sessionmaker(bind=engine)() as session:
+            return session.scalar(select(func.count()).select_from(dbas.PurchaseRequestHeader))
+
+    try:
+        with pytest.raises(RuntimeError, match="test_db_service.py.*in count_headers"):
+            count_headers()
+        # Off the loop thread nothing is blocked
+        assert await asyncio.to_thread(count_headers) == 0
+
+        monkeypatch.setattr(dbas.settings, "sync_db_on_loop", "off")
+        assert count_headers() == 0
+    finally:
+        engine.dispose()
+
+@pytest.mark.asyncio
+async def test_production_pragma_profile_is_applied_to_pooled_connections(async_session_factory, monkeypatch):
+    monkeypatch.setattr(dbas.settings, "sqlite_pragma_profile", "production")
+    async with async_session_factory() as db:
+        in_effect = {
+            pragma: str((await db.execute(text(f"PRAGMA {pragma}"))).scalar())
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "temp_store")
+        }
+    assert in_effect == {"journal_mode": "wal", "synchronous": "1", "busy_timeout": "5000", "temp_store": "2"}
+
+@pytest.mark.asyncio
+async def test_app_engines_apply_the_pragma_profile_to_every_pooled_connection(db_path, monkeypatch):
+    assert event.contains(dbas.engine, "connect", dbas.apply_sqlite_pragmas)
+    assert event.contains(dbas.engine_async.sync_engine, "connect", dbas.apply_sqlite_pragmas)
+
+    monkeypatch.setattr(dbas.settings, "sqlite_pragma_profile", "production")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    event.listen(engine.sync_engine, "connect", dbas.apply_sqlite_pragmas)
+    monkeypatch.setattr(dbas, "engine_async", engine)
+    try:
+        # Two connections checked out at once: each was opened (and set up) separately
+        async with engine.connect() as first, engine.connect() as second:
+            for conn in (first, second):
+                assert (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar() == 5000
+        in_effect = await dbas.check_sqlite_pragmas()
+    finally:
+        await engine.dispose()
+    assert in_effect["journal_mode"] == "wal"
+    assert in_effect["cache_size"] == "-65536"
+    assert in_effect["mmap_size"] == "268435456"
+
+@pytest.mark.asyncio
+async def test_stream_flat_approvals_yields_every_row_in_bounded_chunks(sync_session, async_session_factory, monkeypatch):
+    add_request(sync_session, "LAWB0007", items=5)
+    add_request(sync_session, "LAWB0008", items=2)
+    sync_session.commit()
+    monkeypatch.setattr(dbas, "AsyncSessionLocal", async_session_factory)
+
+    chunks = [chunk async for chunk in dbas.stream_flat_approvals(chunk_size=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert sorted(row["UUID"] for chunk in chunks for row in chunk) == sorted(
+        [f"LAWB0007-{n}" for n in range(5)] + ["LAWB0008-0", "LAWB0008-1"]
+    )
+
+    only = [row["ID"] async for chunk in dbas.stream_flat_approvals(ID="LAWB0008", chunk_size=3) for row in chunk]
+    assert only == ["LAWB0008", "LAWB0008"]
+
+@pytest.mark.asyncio
+async def test_stream_flat_approvals_holds_one_chunk_at_a_time(sync_session, async_session_factory, monkeypatch):
+    add_request(sync_session, "LAWB0009", items=7)
+    sync_session.commit()
+    monkeypatch.setattr(dbas, "AsyncSessionLocal", async_session_factory)
+    encoded = 0
+    encode_approval_row = dbas.encode_approval_row
+    def counting_encoder(row):
+        nonlocal encoded
+        encoded += 1
+        return encode_approval_row(row)
+    monkeypatch.setattr(dbas, "encode_approval_row", counting_encoder)
+    yield_per = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        yield_per.append(context.execution_options.get("yield_per"))
+
+    async with async_session_factory() as db:
+        engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        stream = dbas.stream_flat_approvals(chunk_size=3)
+        # Rows are read off the cursor a partition at a time, never all up front
+        assert len(await stream.__anext__()) == 3 and encoded == 3
+        assert len(await stream.__anext__()) == 3 and encoded == 6
+        await stream.aclose()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert yield_per == [3]
+
+@pytest.mark.asyncio
+async def test_submission_bulk_inserts_each_table_once_in_one_transaction(pras_api, monkeypatch):
+    # In-memory database on one shared connection, so every statement goes through this engine
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(dbas.Base.metadata.create_all)
+    log = []
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            log.append((statement.split()[2], executemany, context.compiled_parameters))
+    event.listen(engine.sync_engine, "commit", lambda conn: log.append(("COMMIT", None, None)))
+
+    async def fake_render(spec):
+        return b"%PDF-1.4", 0.0
+    monkeypatch.setattr(pras_api.pdf_service.render_engine, "render", fake_render)
+
+    response = await submit(pras_api, sessionmaker(bind=engine, class_=AsyncSession), 4)
+    await engine.dispose()
+    assert response.status_code == 200
+
+    # The draft header, then one executemany per table, then the one commit
+    assert [(table, many) for table, many, _ in log[:5]] == [
+        ("purchase_request_headers", False),
+        ("pr_line_items", True),
+        ("approvals", True),
+        ("pending_approvals", True),
+        ("COMMIT", None),
+    ]
+    line_items, approvals, pending = (params for _, _, params in log[1:4])
+    assert len(line_items) == len(approvals) == len(pending) == 4
+    # UUIDs are generated before the insert and tie the three row sets together
+    assert all(uuid.UUID(row["UUID"]) for row in line_items + approvals)
+    assert [row["line_item_uuid"] for row in pending] == [row["UUID"] for row in line_items]
+    assert [row["approvals_uuid"] for row in pending] == [row["UUID"] for row in approvals]
@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+from api.schemas.approval_schemas import ApprovalSchema
+from api.schemas.enums import ItemStatus
+from api.utils.json_utils import dumps, make_row_encoder
+
+def make_row():
+    return {
+        "UUID": "test-uuid-1",
+        "purchase_request_id": "LAWB0001",
+        "IRQ1_ID": None,
+        "requester": "roman",
+        "CO": None,
+        "datereq": "2025-06-05",
+        "orderType": "QUARTERLY_ORDER",
+        "itemDescription": "Wireless Keyboard and Mouse Combo",
+        "justification": "Replacement for broken peripherals",
+        "trainNotAval": False,
+        "needsNotMeet": True,
+        "budgetObjCode": "6100",
+        "fund": "51140X",
+        "priceEach": 45.0,
+        "totalPrice": 225.0,
+        "location": "LKCH/C",
+        "quantity": 5,
+        "created_time": datetime(2025, 6, 5, 14, 30, 1),
+        "isCyberSecRelated": False,
+        "status": ItemStatus.NEW_REQUEST,
+    }
+
+def test_row_encoder_matches_model_dump():
+    row = make_row()
+    expected = ApprovalSchema(**row).model_dump(mode="json", by_alias=True)
+    encoded = make_row_encoder(ApprovalSchema)(row)
+    assert encoded == expected
+    assert json.loads(dumps(encoded)) == expected
@@ -0,0 +1,94 @@
+import os
+from datetime import datetime, timezone
+import pytest
+from api.schemas.approval_schemas import ApprovalSchema
+from api.services.pdf_cache_service import PdfRenderCache, render_cache_key
+from api.services.pdf_render_engine import _WARMUP_ROW
+from api.services.pdf_service import PDFService
+from api.settings import settings
+
+def render_into(cache: PdfRenderCache, key: str, size: int):
+    return cache.put(key, b"%" * size, render_seconds=0.5)
+
+def test_key_changes_with_any_input():
+    inputs = {"rows": [{"UUID": "li-1", "totalPrice": 50.0}], "order_type": None, "final_approved_at": datetime(2025, 6, 5)}
+    assert render_cache_key(inputs) == render_cache_key(dict(reversed(list(inputs.items()))))
+    assert render_cache_key(inputs) != render_cache_key({**inputs, "order_type": "NO_RUSH"})
+    assert render_cache_key(inputs) != render_cache_key({**inputs, "final_approved_at": datetime(2025, 6, 6)})
+
+def test_hits_return_the_stored_render_and_count_saved_time(tmp_path):
+    cache = PdfRenderCache(tmp_path, max_bytes=1024)
+    assert cache.get("a") is None
+    render_into(cache, "a", 10)
+    assert cache.get("a") == b"%" * 10
+    assert list(tmp_path.glob("*.tmp")) == []
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["saved_render_seconds"] == 0.5
+
+def test_least_recently_used_files_are_evicted_over_the_bound(tmp_path):
+    cache = PdfRenderCache(tmp_path, max_bytes=25)
+    render_into(cache, "old", 10)
+    render_into(cache, "used", 10)
+    os.utime(cache.path_for("old"), (1, 1))
+    os.utime(cache.path_for("used"), (2, 2))
+    cache.get("used")  # touching it makes "old" the eviction candidate
+
+    render_into(cache, "new", 10)
+    assert not cache.path_for("old").exists()
+    assert cache.path_for("used").exists() and cache.path_for("new").exists()
+
+    # A restarted cache picks up what is on disk
+    assert PdfRenderCache(tmp_path, max_bytes=25).get("new") is not None
+
+@pytest.mark.asyncio
+async def test_download_and_submit_paths_share_a_render(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "PDF_OUTPUT_FOLDER", tmp_path)
+    monkeypatch.setattr(settings, "pdf_render_workers", 0)
+    service = PDFService()
+    rows = [{**_WARMUP_ROW, "purchase_request_id": "LAWB0001", "datereq": ""}]
+
+    # Download path: comments (never printed) and get_order_types' list
+    downloaded = await service.render_pdf_from_rows("LAWB0001", rows, comments=["Approved"], order_type=["NO_RUSH"])
+    # Submit path: no comments, the header's order type
+    submitted = await service.render_pdf_from_rows("LAWB0001", rows, order_type="NO_RUSH")
+
+    assert submitted == downloaded
+    assert (service.render_cache.renders, service.render_cache.hits) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_submit_and_download_rows_share_a_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "PDF_OUTPUT_FOLDER", tmp_path)
+    service = PDFService()
+    keys = []
+    async def fake_render(spec):
+        return b"%PDF", 0.0
+    monkeypatch.setattr(service.render_engine, "render", fake_render)
+    monkeypatch.setattr(service.render_cache, "get", lambda key: keys.append(key))
+
+    item = dict(
+        purchase_request_id="LAWB0001", IRQ1_ID=None, requester="roman", CO=None, datereq="2025-06-05",
+        orderType="QUARTERLY_ORDER", itemDescription="Label printer", justification="Replacement",
+        trainNotAval=False, needsNotMeet=False, budgetObjCode="6100", fund="51140X", priceEach=10.0,
+        totalPrice=20.0, location="LKCH/C", quantity=2, isCyberSecRelated=False,
+    )
+    # Built in send_purchase_request: tz-aware timestamp, status as a str
+    submitted = [{**item, "UUID": "li-1", "created_time": datetime(2025, 6, 5, 9, tzinfo=timezone.utc), "status": "NEW REQUEST"}]
+    # fetch_flat_approvals: naive timestamp read back from SQLite, status as ItemStatus, extra keys
+    downloaded = [ApprovalSchema(**item, UUID="li-1", created_time=datetime(2025, 6, 5, 9), status="NEW REQUEST").model_dump()]
+    await service.render_pdf_from_rows("LAWB0001", submitted, order_type="QUARTERLY_ORDER")
+    await service.render_pdf_from_rows("LAWB0001", downloaded, order_type=["QUARTERLY_ORDER"])
+    assert keys[0] == keys[1]
+
+    # Only the first row's status is printed
+    second = {**downloaded[0], "UUID": "li-2"}
+    for rows in (
+        [downloaded[0], second],
+        [downloaded[0], {**second, "status": "APPROVED"}],
+        [{**downloaded[0], "status": "APPROVED"}, second],
+    ):
+        await service.render_pdf_from_rows("LAWB0001", rows, order_type="QUARTERLY_ORDER")
+    assert keys[2] == keys[3] != keys[4]
@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import time
+import pytest
+from fastapi import HTTPException
+import api.services.pdf_render_engine as render_engine
+from api.services.pdf_render_engine import PdfRenderEngine, RenderSpec, _WARMUP_ROW
+
+def sleepy_render(spec: RenderSpec) -> tuple[bytes, float]:
+    """Stands in for the real render: sleeps for the row's "sleep" seconds"""
+    seconds = spec.rows[0]["sleep"]
+    time.sleep(seconds)
+    return b"%PDF-1.4 stub", seconds
+
+def no_warmup():
+    pass
+
+def spec(sleep: float) -> RenderSpec:
+    return RenderSpec(rows=[{"purchase_request_id": "LAWB0001", "sleep": sleep}])
+
+@pytest.fixture
+def sleepy(monkeypatch):
+    # Module-level stubs, so they pickle to the worker processes by name
+    monkeypatch.setattr(render_engine, "render", sleepy_render)
+    monkeypatch.setattr(render_engine, "_init_worker", no_warmup)
+
+@pytest.mark.asyncio
+async def test_thread_fallback_renders_the_statement_of_need():
+    engine = PdfRenderEngine(workers=0, max_pending=2, queue_wait_sec=1, timeout_sec=30)
+    await engine.start()
+
+    pdf, seconds = await engine.render(RenderSpec(rows=[_WARMUP_ROW]))
+    assert pdf.startswith(b"%PDF")
+    assert seconds > 0
+
+@pytest.mark.asyncio
+async def test_renders_beyond_max_pending_get_503(sleepy):
+    engine = PdfRenderEngine(workers=0, max_pending=1, queue_wait_sec=0.05, timeout_sec=5)
+
+    busy = asyncio.create_task(engine.render(spec(0.5)))
+    await asyncio.sleep(0.01)
+    with pytest.raises(HTTPException) as rejected:
+        await engine.render(spec(0))
+    assert rejected.value.status_code == 503
+    assert await busy == (b"%PDF-1.4 stub", 0.5)
+
+@pytest.mark.asyncio
+async def test_time_spent_queued_does_not_count_toward_the_timeout(sleepy):
+    engine = PdfRenderEngine(workers=1, max_pending=4, queue_wait_sec=5, timeout_sec=1)
+    await engine.start()
+    try:
+        # 1.8s of work on one worker: the last job waits 1.2s but renders in 0.6s
+        results = await asyncio.gather(*(engine.render(spec(0.6)) for _ in range(3)))
+        assert [seconds for _, seconds in results] == [0.6] * 3
+    finally:
+        engine.shutdown()
+
+@pytest.mark.asyncio
+async def test_render_over_the_timeout_gets_504_and_a_fresh_pool(sleepy):
+    engine = PdfRenderEngine(workers=1, max_pending=2, queue_wait_sec=1, timeout_sec=0.5)
+    await engine.start()
+    try:
+        stuck_pool = engine._executor
+        stuck_processes = multiprocessing.active_children()
+        assert stuck_processes
+        with pytest.raises(HTTPException) as timed_out:
+            await engine.render(spec(30))
+        assert timed_out.value.status_code == 504
+
+        # The stuck worker is killed, not left to finish its 30s
+        assert engine._executor is not stuck_pool
+        for process in stuck_processes:
+            process.join(timeout=5)
+            assert not process.is_alive()
+        assert await engine.render(spec(0)) == (b"%PDF-1.4 stub", 0)
+    finally:
+        engine.shutdown()
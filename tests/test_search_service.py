@@ -0,0 +1,259 @@
+import sqlite3
+from datetime import datetime
+from contextlib import contextmanager
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+import api.services.db_service as dbas
+from api.schemas.enums import ItemStatus
+from api.services.search_service import SearchService, _OrderedDictLRU, _in_offpeak_window, _query_parser, TEXT_QUERY_FIELDS
+from api.settings import settings
+from whoosh.query import NumericRange
+from whoosh.reading import SegmentReader
+from whoosh.util.times import datetime_to_long
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "api" / "db" / "migrations"
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Throwaway database with the ORM tables plus the migration triggers"""
+    db_path = tmp_path / "search.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    dbas.Base.metadata.create_all(engine)
+    with sqlite3.connect(db_path) as conn:
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            conn.executescript(path.read_text(encoding="utf-8"))
+
+    SessionLocal = sessionmaker(bind=engine)
+
+    @contextmanager
+    def factory():
+        with SessionLocal() as session:
+            yield session
+
+    yield factory
+    engine.dispose()
+
+def add_request(session, ID: str, uuid: str, description: str, total: float = 50.0, created: datetime | None = None):
+    session.add(dbas.PurchaseRequestHeader(
+        ID=ID, requester="roman", datereq="2025-06-05", orderType="QUARTERLY_ORDER", submission_status="SUBMITTED",
+    ))
+    session.add(dbas.PurchaseRequestLineItem(
+        UUID=uuid, purchase_request_id=ID, itemDescription=description, justification="Replacement",
+        budgetObjCode="6100", fund="51140X", quantity=1, priceEach=total, originalPriceEach=total, totalPrice=total, location="LKCH/C",
+        created_time=created or datetime(2025, 6, 5, 9, 0, 0),
+    ))
+
+def test_new_line_item_searchable_after_one_commit(session_factory):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+
+    with session_factory() as session:
+        add_request(session, "LAWB0001", "li-1", "Ergonomic keyboard")
+        session.commit()
+
+    assert service.execute_search("keyboard") == []
+    assert service.process_index_queue() == 1
+
+    hits = service.execute_search("keyboard")
+    assert [(h["ID"], h["UUID"]) for h in hits] == [("LAWB0001", "li-1")]
+
+def test_core_update_reaches_index(session_factory):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+
+    with session_factory() as session:
+        add_request(session, "LAWB0002", "li-2", "Standing desk")
+        session.commit()
+    service.process_index_queue()
+
+    # Core UPDATE: no ORM objects are dirty, the triggers still queue the request
+    with session_factory() as session:
+        session.execute(
+            update(dbas.PurchaseRequestLineItem)
+            .where(dbas.PurchaseRequestLineItem.UUID == "li-2")
+            .values(status=ItemStatus.DENIED)
+        )
+        session.commit()
+    service.process_index_queue()
+
+    hits = service.execute_search("desk")
+    assert len(hits) == 1
+    assert hits[0]["status"] == ItemStatus.DENIED.value
+
+def test_restart_catches_up_from_queue_without_rebuild(session_factory, tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "indexdir")
+    SearchService(session_factory=session_factory, index_dir=index_dir)
+
+    # Committed while the service was down: only the queue knows about it
+    with session_factory() as session:
+        add_request(session, "LAWB0003", "li-3", "Label printer")
+        session.commit()
+
+    def fail_rebuild(self, db=None):
+        raise AssertionError("persisted index should be reused")
+    monkeypatch.setattr(SearchService, "create_whoosh_index", fail_rebuild)
+
+    service = SearchService(session_factory=session_factory, index_dir=index_dir)
+    assert [h["UUID"] for h in service.execute_search("printer")] == ["li-3"]
+
+def test_rebuild_swaps_in_a_new_build_while_searching(session_factory, tmp_path):
+    index_dir = tmp_path / "indexdir"
+    service = SearchService(session_factory=session_factory, index_dir=str(index_dir))
+    with session_factory() as session:
+        add_request(session, "LAWB0006", "li-6", "Cable tray")
+        session.commit()
+    service.process_index_queue()
+    before = [p.name for p in index_dir.iterdir() if p.is_dir()]
+    assert service.execute_search("tray")
+
+    service.rebuild_index()
+
+    # The search thread's old searcher is swapped for one on the new build
+    assert [h["UUID"] for h in service.execute_search("tray")] == ["li-6"]
+    after = [p.name for p in index_dir.iterdir() if p.is_dir()]
+    assert len(after) == 1 and after != before
+    assert service._read_meta()["dir"] == after[0]
+
+def test_faceted_search_counts_and_filters(session_factory):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+    with session_factory() as session:
+        add_request(session, "LAWB0004", "li-4", "Monitor arm")
+        add_request(session, "LAWB0005", "li-5", "Monitor stand")
+        session.commit()
+        session.execute(
+            update(dbas.PurchaseRequestLineItem)
+            .where(dbas.PurchaseRequestLineItem.UUID == "li-5")
+            .values(status=ItemStatus.APPROVED, totalPrice=75.0)
+        )
+        session.commit()
+    service.process_index_queue()
+
+    everything = service.execute_faceted_search("", pagelen=1, sort="totalPrice", reverse=True)
+    assert everything["total"] == 2
+    assert everything["pages"] == 2
+    assert [h["UUID"] for h in everything["results"]] == ["li-5"]
+    assert everything["facets"]["status"] == {ItemStatus.NEW_REQUEST.value: 1, ItemStatus.APPROVED.value: 1}
+    assert everything["facets"]["fund"] == {"51140X": 2}
+
+    approved = service.execute_faceted_search("monitor", filters={"status": ItemStatus.APPROVED.value})
+    assert [h["UUID"] for h in approved["results"]] == ["li-5"]
+
+def test_result_cache_hits_until_the_index_generation_moves(session_factory):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+    with session_factory() as session:
+        add_request(session, "LAWB0006", "li-6", "Docking station")
+        session.commit()
+    service.process_index_queue()
+
+    first = service.execute_search("docking")
+    assert service.execute_search("  docking ") is first
+    assert service.cache_stats()["hits"] == 1
+
+    with session_factory() as session:
+        add_request(session, "LAWB0007", "li-7", "Docking station")
+        session.commit()
+    service.process_index_queue()
+
+    assert len(service.execute_search("docking")) == 2
+    stats = service.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+def test_offpeak_window_wraps_past_midnight():
+    assert {h for h in range(24) if _in_offpeak_window(h, 19, 6)} == {19, 20, 21, 22, 23, 0, 1, 2, 3, 4, 5}
+    assert {h for h in range(24) if _in_offpeak_window(h, 1, 4)} == {1, 2, 3}
+
+def test_maintenance_merges_segments_and_keeps_results(session_factory, monkeypatch):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+    # One segment per drain; Whoosh's MERGE_SMALL only merges once there are five or more
+    for n in range(5):
+        with session_factory() as session:
+            add_request(session, f"LAWB001{n}", f"li-1{n}", "Toner cartridge")
+            session.commit()
+        service.process_index_queue()
+    assert service._segment_stats()["segments"] == 5
+
+    monkeypatch.setattr(settings, "search_merge_segment_threshold", 4)
+    assert service.maintain_index(force=True) == "merge"
+    assert service._segment_stats()["segments"] == 1
+    assert len(service.execute_search("toner")) == 5
+
+def test_range_syntax_parses_to_index_range_queries():
+    parser = _query_parser(TEXT_QUERY_FIELDS)
+
+    price = parser.parse("price:>5000")
+    assert isinstance(price, NumericRange)
+    assert (price.fieldname, price.start, price.end, price.startexcl) == ("totalPrice", 5000.0, None, True)
+
+    # DATETIME is numeric underneath, so a date range parses to a NumericRange over the long timestamps
+    month = parser.parse("date:2025-03")
+    assert isinstance(month, NumericRange)
+    assert (month.fieldname, month.start, month.end) == (
+        "createdTime",
+        datetime_to_long(datetime(2025, 3, 1)),
+        datetime_to_long(datetime(2025, 3, 31, 23, 59, 59, 999999)),
+    )
+
+def test_range_filters_never_read_stored_fields(session_factory, monkeypatch):
+    service = SearchService(session_factory=session_factory, use_ram=True)
+    with session_factory() as session:
+        add_request(session, "LAWB0006", "li-6", "Server rack", total=7500.0, created=datetime(2025, 3, 14))
+        add_request(session, "LAWB0007", "li-7", "Server rail kit", total=120.0, created=datetime(2025, 3, 20))
+        add_request(session, "LAWB0008", "li-8", "Server fan", total=9000.0, created=datetime(2025, 4, 2))
+        session.commit()
+    service.process_index_queue()
+
+    searcher = service._searcher()
+    query = _query_parser(TEXT_QUERY_FIELDS).parse("price:>5000 AND date:2025-03")
+
+    # Matching must be answered from the indexed terms alone
+    def no_stored_fields(self, docnum):
+        raise AssertionError("range query read stored fields")
+    monkeypatch.setattr(SegmentReader, "stored_fields", no_stored_fields)
+    docnums = list(searcher.search(query, limit=None).docs())
+    monkeypatch.undo()
+
+    assert [searcher.stored_fields(d)["UUID"] for d in docnums] == ["li-6"]
+    assert service.execute_search("price:>5000 AND date:2025-03")[0]["createdTime"] == "2025-03-14"
+
+def test_fts5_backend_matches_whoosh_without_a_drain(session_factory, tmp_path):
+    from api.services.fts_search_service import Fts5SearchService
+    whoosh = SearchService(session_factory=session_factory, use_ram=True)
+    fts = Fts5SearchService(session_factory=session_factory, index_dir=str(tmp_path / "indexdir"))
+
+    with session_factory() as session:
+        add_request(session, "LAWB0009", "li-9", "Docking station")
+        add_request(session, "LAWB0010", "li-10", "Dock cable")
+        session.commit()
+
+    # Triggers keep approval_fts current inside the commit
+    assert {h["UUID"] for h in fts.execute_search("dock")} == {"li-9", "li-10"}
+
+    whoosh.process_index_queue()
+    assert fts.execute_search("docking") == whoosh.execute_search("docking")
+
+    faceted = fts.execute_faceted_search("dock", sort="createdTime")
+    assert faceted["total"] == 2
+    assert faceted["facets"]["fund"] == {"51140X": 2}
+
+def test_full_rebuild_indexes_every_line_item(session_factory):
+    with session_factory() as session:
+        add_request(session, "LAWB0011", "li-11a", "Wireless mouse")
+        session.add(dbas.PurchaseRequestLineItem(
+            UUID="li-11b", purchase_request_id="LAWB0011", itemDescription="Wireless headset", justification="Replacement",
+            budgetObjCode="6100", fund="51140X", quantity=1, priceEach=20.0, originalPriceEach=20.0, totalPrice=20.0,
+            location="LKCH/C", created_time=datetime(2025, 6, 5, 9, 0, 0),
+        ))
+        session.commit()
+
+    # use_ram builds from the database in one pass, not from the queue
+    service = SearchService(session_factory=session_factory, use_ram=True)
+    assert {h["UUID"] for h in service.execute_search("wireless")} == {"li-11a", "li-11b"}
+
+def test_ordered_dict_lru_evicts_the_least_recently_used():
+    cache = _OrderedDictLRU(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache["c"] = 3
+    assert list(cache) == ["a", "c"]
+    assert cache.get("b", "missing") == "missing"
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+from pathlib import Path
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+import api.services.db_service as dbas
+from api.schemas.ldap_schema import LDAPUser
+from api.services.pdf_cache_service import PdfRenderCache
+from api.settings import settings
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "api" / "db" / "migrations"
+
+@pytest_asyncio.fixture
+async def pras_api(monkeypatch, tmp_path):
+    """
+    The app module with LDAP, socket.io and email stubbed out (as in conftest's client).
+    Imported from a running loop: module-level services start background tasks.
+    """
+    import api.services.ldap_service as ldap_mod
+    monkeypatch.setattr(ldap_mod.LDAPService, "__init__", lambda self, *args, **kwargs: None)
+    import api.pras_api as pras_api
+
+    async def fake_emit(*args, **kwargs):
+        return None
+    monkeypatch.setattr(pras_api.sio, "emit", fake_emit)
+
+    sent = []
+    async def fake_send_approver_email(payload, db, send_to):
+        sent.append(("approver", payload))
+    async def fake_send_requester_email(payload, db=None):
+        sent.append(("requester", payload))
+    monkeypatch.setattr(pras_api.smtp_service, "send_approver_email", fake_send_approver_email)
+    monkeypatch.setattr(pras_api.smtp_service, "send_requester_email", fake_send_requester_email)
+    pras_api.sent_emails = sent
+
+    # Render on a thread into tmp_path, with an empty cache so every render is counted
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "output").mkdir()
+    monkeypatch.setattr(settings, "PDF_OUTPUT_FOLDER", tmp_path)
+    monkeypatch.setattr(pras_api.pdf_service, "output_dir", tmp_path / "output")
+    monkeypatch.setattr(pras_api.pdf_service, "render_cache", PdfRenderCache(tmp_path / "son_cache", max_bytes=1 << 30))
+    monkeypatch.setattr(pras_api.pdf_service.render_engine, "workers", 0)
+    return pras_api
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    path = tmp_path / "pras.db"
+    engine = create_engine(f"sqlite:///{path}")
+    dbas.Base.metadata.create_all(engine)
+    engine.dispose()
+    with sqlite3.connect(path) as conn:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            conn.executescript(migration.read_text(encoding="utf-8"))
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    event.listen(async_engine.sync_engine, "connect", dbas.apply_sqlite_pragmas)
+    yield sessionmaker(bind=async_engine, class_=AsyncSession)
+    await async_engine.dispose()
+
+def payload_json(items: int) -> str:
+    return json.dumps({
+        "requester": "roman",
+        "itemCount": items,
+        "items": [
+            {
+                "requester": "roman", "datereq": "2025-06-05", "orderType": "QUARTERLY_ORDER",
+                "itemDescription": f"Item {n}", "justification": "Replacement", "budgetObjCode": "6100",
+                "fund": "51140X", "quantity": 1, "priceEach": 10.0, "totalPrice": 10.0, "location": "LKCH/C",
+            }
+            for n in range(items)
+        ],
+    })
+
+async def submit(pras_api, session_factory, items: int):
+    user = LDAPUser(username="roman", email="roman@example.com", groups=["users"])
+    async with session_factory() as db:
+        return await pras_api.send_purchase_request(payload_json=payload_json(items), current_user=user, db=db)
+
+async def submitted_header(session_factory):
+    async with session_factory() as db:
+        return (await db.execute(select(dbas.PurchaseRequestHeader))).scalar_one()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("items", [1, 25])
+async def test_submission_renders_the_statement_of_need_once(pras_api, session_factory, monkeypatch, items):
+    engine = pras_api.pdf_service.render_engine
+    real_render = engine.render
+    rendered = []
+    async def counting_render(spec):
+        rendered.append(len(spec.rows))
+        return await real_render(spec)
+    monkeypatch.setattr(engine, "render", counting_render)
+
+    response = await submit(pras_api, session_factory, items)
+
+    assert response.status_code == 200
+    assert rendered == [items]
+    header = await submitted_header(session_factory)
+    assert Path(header.pdf_output_path).exists()
+    assert [payload.attachments for _, payload in pras_api.sent_emails] == [[header.pdf_output_path]] * 2
+
+@pytest.mark.asyncio
+async def test_failed_render_still_completes_the_submission(pras_api, session_factory, monkeypatch):
+    async def busy_render(spec):
+        raise HTTPException(status_code=503, detail="PDF renderer is busy, try again shortly")
+    monkeypatch.setattr(pras_api.pdf_service.render_engine, "render", busy_render)
+
+    response = await submit(pras_api, session_factory, 3)
+
+    assert response.status_code == 200
+    header = await submitted_header(session_factory)
+    assert (header.submission_status, header.pdf_output_path) == ("SUBMITTED", None)
+    assert sorted(kind for kind, _ in pras_api.sent_emails) == ["approver", "requester"]
+    assert all(not payload.attachments for _, payload in pras_api.sent_emails)
@@ -0,0 +1,100 @@
+import asyncio
+import io
+import zipfile
+import pytest
+import pytest_asyncio
+import api.services.son_export_service as son_export_service
+from api.services.son_export_service import stream_statements_of_need_zip
+from api.settings import settings
+
+class NoSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class FakePdfService:
+    """create_pdf_bytes that takes `delay` seconds, fails for IDs in `failing` and records what is in flight"""
+
+    def __init__(self, delay: float = 0.0, failing: tuple = ()):
+        self.delay = delay
+        self.failing = failing
+        self.started = 0
+        self.running = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    async def create_pdf_bytes(self, ID, session, track_progress=True):
+        self.started += 1
+        self.running += 1
+        try:
+            await asyncio.sleep(self.delay(ID) if callable(self.delay) else self.delay)
+            if ID in self.failing:
+                raise RuntimeError("render failed")
+            self.completed += 1
+            return f"%PDF {ID}".encode()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+@pytest_asyncio.fixture
+async def export(monkeypatch):
+    # The export reports progress through sio_events, which builds the LDAP-backed services
+    import api.services.ldap_service as ldap_mod
+    monkeypatch.setattr(ldap_mod.LDAPService, "__init__", lambda self, *args, **kwargs: None)
+    monkeypatch.setattr(son_export_service, "AsyncSessionLocal", NoSession)
+    return stream_statements_of_need_zip
+
+def ids(count: int) -> list[str]:
+    return [f"LAWB{n:04d}" for n in range(1, count + 1)]
+
+@pytest.mark.asyncio
+async def test_export_is_a_valid_zip_listing_failures(export):
+    pdf_service = FakePdfService(failing=("LAWB0002",))
+
+    data = b"".join([chunk async for chunk in export(pdf_service, ids(3), concurrency=2)])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == [
+            "export_errors.txt", "statement_of_need-LAWB0001.pdf", "statement_of_need-LAWB0003.pdf",
+        ]
+        assert archive.read("statement_of_need-LAWB0003.pdf") == b"%PDF LAWB0003"
+        assert archive.read("export_errors.txt") == b"LAWB0002: render failed\n"
+
+@pytest.mark.asyncio
+async def test_slow_client_keeps_at_most_concurrency_pdfs_in_flight(export):
+    concurrency = settings.son_export_concurrency
+    pdf_service = FakePdfService()
+    consumed = 0
+    peak = 0
+    create_pdf_bytes = pdf_service.create_pdf_bytes
+    async def tracked(ID, session, track_progress=True):
+        nonlocal peak
+        # Rendering plus rendered-but-not-yet-sent
+        peak = max(peak, pdf_service.started + 1 - consumed)
+        return await create_pdf_bytes(ID, session, track_progress)
+    pdf_service.create_pdf_bytes = tracked
+
+    async for chunk in export(pdf_service, ids(12), concurrency=concurrency):
+        consumed += 1
+        await asyncio.sleep(0.01)
+
+    assert pdf_service.completed == 12
+    assert peak == concurrency
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_pending_renders(export):
+    # The first render is instant, the rest would take a minute
+    pdf_service = FakePdfService(delay=lambda ID: 0 if ID == "LAWB0001" else 60)
+    stream = export(pdf_service, ids(5), concurrency=2)
+
+    first = await stream.__anext__()
+    assert first
+    await stream.aclose()
+
+    assert (pdf_service.completed, pdf_service.running) == (1, 0)
+    assert pdf_service.cancelled == pdf_service.started - 1
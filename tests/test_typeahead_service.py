@@ -0,0 +1,15 @@
+from api.services.typeahead_service import PrefixIndex
+
+def test_prefix_lookup_is_case_insensitive_and_sorted():
+    index = PrefixIndex(["roman", "Robert", "rachel", "alice", None, ""])
+    assert index.complete("RO") == ["Robert", "roman"]
+    assert index.complete("r", limit=2) == ["rachel", "Robert"]
+    assert index.complete("z") == []
+    assert len(index) == 4
+
+def test_add_keeps_order_and_ignores_duplicates():
+    index = PrefixIndex(["LKCH/C"])
+    index.add("lkch/c")
+    index.add("LKCH/A")
+    index.add("")
+    assert index.complete("lkch") == ["LKCH/A", "LKCH/C"]